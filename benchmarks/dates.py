@@ -0,0 +1,104 @@
+"""
+Compare city_scrapers.dates.parse_datetime with dateutil on the date strings the
+spiders extract from the test fixtures.
+
+    python -m benchmarks.dates [--number 200]
+"""
+
+import argparse
+import json
+import timeit
+from os.path import dirname, join
+
+from city_scrapers_core.utils import file_response
+from dateutil.parser import parse as dateutil_parse
+
+from city_scrapers.dates import _parse_datetime, parse_datetime
+
+FILES_DIR = join(dirname(dirname(__file__)), "tests", "files")
+
+
+def fixture_dates():
+    """Return (value, kwargs) pairs for each date string parsed from the fixtures"""
+    dates = []
+
+    response = file_response(join(FILES_DIR, "fortx_Fort_Worth_Isd.html"))
+    for value in response.css(
+        ".fsStateHasEvents .fsStartTime::attr(datetime), "
+        ".fsStateHasEvents .fsEndTime::attr(datetime)"
+    ).getall():
+        dates.append((value, {"ignoretz": True}))
+
+    response = file_response(join(FILES_DIR, "fortx_Fort_Worth_Isd_Coc.html"))
+    for row in response.css("table")[0].css("tr"):
+        dates.append((f"{row.css('td::text').get()} 6:00PM", {}))
+    for value in response.css(".fsDayContainer .fsStartTime::attr(datetime)").getall():
+        dates.append((value, {"ignoretz": True}))
+
+    response = file_response(join(FILES_DIR, "fortx_Fort_Worth_Isd_Meetings.html"))
+    for row in response.css("table tbody tr"):
+        date, time = row.css("td")[0].css("div::text").get().split("at")
+        dates.append((f"{date} {time.split('-')[0]}", {}))
+
+    with open(join(FILES_DIR, "fortx_Fort_Worth_Boards.json")) as f:
+        for day in json.load(f)["data"]:
+            for item in day["Items"]:
+                dates.append((item["DateTime"], {"dayfirst": True}))
+
+    for name in ["archived", "upcoming"]:
+        path = join(
+            FILES_DIR, f"fortx_Tarrant_County_Commissioners_Court_{name}_meetings.json"
+        )
+        with open(path) as f:
+            for item in json.load(f)["data"]:
+                for key in ["meetingStartDateTime", "meetingEndDateTime"]:
+                    if item.get(key):
+                        dates.append((item[key], {}))
+    return dates
+
+
+def run_dateutil(dates):
+    for value, kwargs in dates:
+        dateutil_parse(value, **kwargs)
+
+
+def run_uncached(dates):
+    _parse_datetime.cache_clear()
+    for value, kwargs in dates:
+        parse_datetime(value, **kwargs)
+
+
+def run_cached(dates):
+    for value, kwargs in dates:
+        parse_datetime(value, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=200, help="runs per case")
+    args = parser.parse_args()
+
+    dates = fixture_dates()
+    mismatches = [
+        value
+        for value, kwargs in dates
+        if parse_datetime(value, **kwargs) != dateutil_parse(value, **kwargs)
+    ]
+    if mismatches:
+        raise SystemExit(f"Results differ from dateutil for: {mismatches}")
+
+    print(f"{len(dates)} date strings from tests/files, {args.number} runs each")
+    baseline = None
+    for label, func in [
+        ("dateutil", run_dateutil),
+        ("parse_datetime (cold)", run_uncached),
+        ("parse_datetime (memoized)", run_cached),
+    ]:
+        seconds = min(timeit.repeat(lambda: func(dates), number=args.number, repeat=3))
+        per_call = seconds / (args.number * len(dates)) * 1e6
+        baseline = baseline or per_call
+        print(f"{label:<28}{per_call:>8.2f} µs/date{baseline / per_call:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
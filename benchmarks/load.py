@@ -0,0 +1,132 @@
+"""
+Crawl each spider against synthetic responses of increasing size served from a
+local HTTP stand-in, reporting throughput and memory as the number of meetings
+grows.
+
+Each crawl runs the full Scrapy stack (downloader, middlewares and pipelines) in
+a fresh process with throttling and robots.txt disabled. Requests keep their
+original URLs, and are sent to the stand-in by a download handler that swaps in
+the local address.
+
+    python -m benchmarks.load [--sizes 100 1000 10000] [spider ...]
+"""
+
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+from benchmarks.synthetic import GENERATORS, StandInServer, path_key
+from city_scrapers.handlers import PooledHTTPDownloadHandler
+
+HANDLER = "benchmarks.load.StandInDownloadHandler"
+
+
+class StandInDownloadHandler(PooledHTTPDownloadHandler):
+    """Downloads every request from the server at BENCHMARK_STAND_IN_URL instead of
+    its host, returning responses with the original URL
+    """
+
+    def __init__(self, settings, crawler=None):
+        super().__init__(settings, crawler)
+        self.stand_in_url = settings.get("BENCHMARK_STAND_IN_URL")
+
+    def download_request(self, request, spider):
+        local_request = request.replace(url=self.stand_in_url + path_key(request.url))
+        dfd = super().download_request(local_request, spider)
+        dfd.addCallback(
+            lambda response: response.replace(url=request.url, request=request)
+        )
+        return dfd
+
+
+def crawl(name, stand_in_url, concurrency):
+    """Crawl one spider against the stand-in, intended to run in its own process"""
+    settings = get_project_settings()
+    with tempfile.TemporaryDirectory() as state_dir:
+        settings.setdict(
+            {
+                "BENCHMARK_STAND_IN_URL": stand_in_url,
+                "DOWNLOAD_HANDLERS": {"http": HANDLER, "https": HANDLER},
+                "ROBOTSTXT_OBEY": False,
+                "AUTOTHROTTLE_ENABLED": False,
+                "CITY_SCRAPERS_ADAPTIVE_THROTTLE": False,
+                "DOWNLOAD_DELAY": 0,
+                "CONCURRENT_REQUESTS": concurrency,
+                "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+                "HTTPCACHE_ENABLED": False,
+                "CITY_SCRAPERS_CONTENTINFO_TTL_HOURS": 0,
+                "CITY_SCRAPERS_STATE_DIR": state_dir,
+                "TELNETCONSOLE_ENABLED": False,
+                "LOG_LEVEL": "WARNING",
+            },
+            priority="cmdline",
+        )
+        process = CrawlerProcess(settings, install_root_handler=False)
+        crawler = process.create_crawler(name)
+        process.crawl(crawler)
+        start = time.perf_counter()
+        # Scrapy's shutdown handlers would keep the pool from terminating the worker
+        process.start(install_signal_handlers=False)
+        seconds = time.perf_counter() - start
+
+    stats = crawler.stats.get_stats()
+    items = stats.get("item_scraped_count", 0)
+    return {
+        "items": items,
+        "requests": stats.get("downloader/request_count", 0),
+        "errors": stats.get("log_count/ERROR", 0),
+        "seconds": round(seconds, 3),
+        "items_per_sec": round(items / seconds, 1),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("spiders", nargs="*", help="spiders to run, defaults to all")
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 10000],
+        help="numbers of meetings to generate for each spider",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=16, help="concurrent requests per crawl"
+    )
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'spider':<42}{'size':>7}{'items':>7}{'requests':>10}{'seconds':>9}"
+        f"{'items/s':>9}{'RSS KiB':>10}{'MiB served':>12}"
+    )
+    for name in args.spiders or list(GENERATORS):
+        for size in args.sizes:
+            responses = GENERATORS[name](size)
+            server = StandInServer(responses).start()
+            try:
+                # Executor workers aren't daemonic, so crawls can start parse workers
+                with ProcessPoolExecutor(1, mp_context=context) as pool:
+                    result = pool.submit(
+                        crawl, name, server.url, args.concurrency
+                    ).result()
+            finally:
+                server.stop()
+            served = sum(len(body) for _, body in responses.values()) / 2**20
+            errors = f"  {result['errors']} errors" if result["errors"] else ""
+            print(
+                f"{name:<42}{size:>7}{result['items']:>7}{result['requests']:>10}"
+                f"{result['seconds']:>9.2f}{result['items_per_sec']:>9.0f}"
+                f"{result['peak_rss_kib']:>10}{served:>12.2f}{errors}"
+            )
+
+
+if __name__ == "__main__":
+    main()
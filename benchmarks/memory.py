@@ -0,0 +1,87 @@
+"""
+Measure the memory held per meeting for an archive-sized crawl, comparing Meeting
+items with the MeetingRecord spiders build before yielding.
+
+The Tarrant County archive fixture is repeated until it has --meetings meetings,
+which are all kept in memory the way pending meetings are while a spider waits for
+more responses.
+
+    python -m benchmarks.memory [--meetings 20000]
+"""
+
+import argparse
+import gc
+import tracemalloc
+from os.path import dirname, join
+
+from city_scrapers_core.constants import COMMISSION
+from city_scrapers_core.items import Meeting
+from city_scrapers_core.utils import file_response
+
+from city_scrapers.items import MeetingRecord
+from city_scrapers.spiders.fortx_Tarrant_County_Commissioners_Court import (
+    FortxTarrantCountyCommissionersCourtSpider,
+)
+
+FIXTURE = join(
+    dirname(dirname(__file__)),
+    "tests",
+    "files",
+    "fortx_Tarrant_County_Commissioners_Court_archived_meetings.json",
+)
+
+
+def build(item_cls, spider, rows):
+    """Build a meeting for each row like the spider's parse method"""
+    meetings = []
+    for item in rows:
+        meeting = item_cls(
+            title=item.get("description", "Commissioners Court"),
+            description="",
+            classification=COMMISSION,
+            start=spider._parse_datetime(item.get("meetingStartDateTime")),
+            end=spider._parse_datetime(item.get("meetingEndDateTime")),
+            all_day=False,
+            time_notes="",
+            location=spider.location,
+            links=spider._parse_links(item),
+            source=spider.source_url,
+        )
+        meeting["status"] = spider._get_status(meeting)
+        meeting["id"] = spider._get_id(meeting)
+        meetings.append(meeting)
+    return meetings
+
+
+def measure(item_cls, spider, rows):
+    """Return the bytes still allocated per meeting once all meetings are built"""
+    gc.collect()
+    tracemalloc.start()
+    meetings = build(item_cls, spider, rows)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(meetings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument(
+        "--meetings", type=int, default=20000, help="number of meetings to build"
+    )
+    args = parser.parse_args()
+
+    data = file_response(FIXTURE).json()["data"]
+    rows = (data * (args.meetings // len(data) + 1))[: args.meetings]
+    spider = FortxTarrantCountyCommissionersCourtSpider()
+
+    print(f"{len(rows)} meetings from {FIXTURE}")
+    results = {}
+    for label, item_cls in [("Meeting", Meeting), ("MeetingRecord", MeetingRecord)]:
+        results[label] = measure(item_cls, spider, rows)
+        print(f"{label:<16}{results[label]:>8.0f} bytes/meeting")
+    saved = 1 - results["MeetingRecord"] / results["Meeting"]
+    print(f"{'reduction':<16}{saved:>8.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Benchmark each spider's parse method against its fixtures in tests/files.
+
+Each spider runs in a fresh process so peak RSS isn't shared between spiders.
+Results are compared with benchmarks/baseline.json, and the command exits with
+an error if any spider's time per item is slower than the baseline by more than
+the threshold. Baselines depend on the machine they're recorded on, so refresh
+them with --save-baseline when comparing on different hardware.
+
+    python -m benchmarks.parse [--number 20] [--repeat 5] [--threshold 0.25]
+                               [--save-baseline] [spider ...]
+"""
+
+import argparse
+import gc
+import json
+import multiprocessing
+import resource
+import sys
+import time
+import tracemalloc
+from os.path import dirname, join
+
+from city_scrapers_core.utils import file_response
+from freezegun import freeze_time
+from scrapy import Request
+from scrapy.http import TextResponse
+
+from city_scrapers.spiders.fortx_Fort_Worth_Boards import FortxFortWorthBoardsSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd import FortxFortWorthIsdSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd_Coc import FortxFortWorthIsdCocSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd_Meetings import (
+    FortxFortWorthIsdMeetingsSpider,
+)
+from city_scrapers.spiders.fortx_Tarrant_County_Commissioners_Court import (
+    FortxTarrantCountyCommissionersCourtSpider,
+)
+
+FILES_DIR = join(dirname(dirname(__file__)), "tests", "files")
+BASELINE_PATH = join(dirname(__file__), "baseline.json")
+# Date fixtures were recorded on, so statuses are computed consistently
+FROZEN_TIME = "2024-10-09"
+
+# Spider class and (fixture file, response URL) pairs parsed in each iteration
+CASES = {
+    spider.name: (spider, fixtures)
+    for spider, fixtures in [
+        (
+            FortxFortWorthBoardsSpider,
+            [
+                (
+                    "fortx_Fort_Worth_Boards.json",
+                    FortxFortWorthBoardsSpider.start_urls[0],
+                )
+            ],
+        ),
+        (
+            FortxFortWorthIsdSpider,
+            [("fortx_Fort_Worth_Isd.html", FortxFortWorthIsdSpider.start_urls[0])],
+        ),
+        (
+            FortxFortWorthIsdCocSpider,
+            [
+                (
+                    "fortx_Fort_Worth_Isd_Coc.html",
+                    FortxFortWorthIsdCocSpider.start_urls[0],
+                )
+            ],
+        ),
+        (
+            FortxFortWorthIsdMeetingsSpider,
+            [
+                (
+                    "fortx_Fort_Worth_Isd_Meetings.html",
+                    FortxFortWorthIsdMeetingsSpider.start_urls[0],
+                )
+            ],
+        ),
+        (
+            FortxTarrantCountyCommissionersCourtSpider,
+            [
+                (f"fortx_Tarrant_County_Commissioners_Court_{name}_meetings.json", url)
+                for name, url in zip(
+                    ["archived", "upcoming"],
+                    FortxTarrantCountyCommissionersCourtSpider.start_urls,
+                )
+            ],
+        ),
+    ]
+}
+
+# Stand-in for Fort Worth contentinfo responses, which don't have a fixture file
+CONTENT_INFO = json.dumps(
+    {
+        "data": {
+            "Description": "Board meeting",
+            "Link": "https://www.fortworthtexas.gov/departments/citysecretary/events",
+            "Address": {
+                "Venue": "City Hall",
+                "Street": "200 Texas St",
+                "Suburb": "Fort Worth",
+                "PostCode": "76102",
+            },
+        },
+        "success": True,
+    }
+)
+
+
+def run_parse(spider, responses):
+    """Run parse on each response, following any requests with stand-in responses
+
+    Responses are copied first so the document is parsed again on each run rather
+    than reusing the selector cached on the response.
+    """
+    items = []
+    pending = [(spider.parse, response.replace(), {}) for response in responses]
+    while pending:
+        callback, response, kwargs = pending.pop(0)
+        for result in callback(response, **kwargs):
+            if isinstance(result, Request):
+                info_response = TextResponse(
+                    url=result.url, request=result, body=CONTENT_INFO, encoding="utf-8"
+                )
+                pending.append((result.callback, info_response, result.cb_kwargs))
+            else:
+                items.append(result)
+    return items
+
+
+def benchmark_spider(name, number, repeat):
+    """Benchmark one spider, intended to run in its own process
+
+    Uses the fastest of several batches of runs to reduce noise from other work on
+    the machine.
+    """
+    spider_cls, fixtures = CASES[name]
+    responses = [
+        file_response(join(FILES_DIR, filename), url=url) for filename, url in fixtures
+    ]
+    spider = spider_cls()
+    with freeze_time(FROZEN_TIME):
+        # warm up caches and lazily parsed response trees
+        item_count = len(run_parse(spider, responses))
+
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                run_parse(spider, responses)
+            timings.append(time.perf_counter() - start)
+        seconds = min(timings)
+
+        gc.collect()
+        gc.disable()
+        tracemalloc.start()
+        blocks_before = sys.getallocatedblocks()
+        items = run_parse(spider, responses)
+        allocated_blocks = sys.getallocatedblocks() - blocks_before
+        _, peak_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        gc.enable()
+        del items
+
+    total_items = item_count * number
+    return {
+        "items": item_count,
+        "items_per_sec": round(total_items / seconds, 1),
+        "us_per_item": round(seconds / total_items * 1e6, 2),
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "peak_traced_kib": round(peak_traced / 1024, 1),
+        "allocated_blocks": allocated_blocks,
+    }
+
+
+def load_baseline():
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("spiders", nargs="*", help="spiders to run, defaults to all")
+    parser.add_argument("--number", type=int, default=20, help="parse runs per batch")
+    parser.add_argument("--repeat", type=int, default=5, help="batches per spider")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown in µs/item relative to the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="write results as the baseline"
+    )
+    args = parser.parse_args()
+
+    names = args.spiders or list(CASES)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for name in names:
+        with context.Pool(1) as pool:
+            results[name] = pool.apply(
+                benchmark_spider, (name, args.number, args.repeat)
+            )
+
+    baseline = load_baseline()
+    regressions = []
+    header = (
+        f"{'spider':<42}{'items':>6}{'items/s':>11}{'µs/item':>10}{'baseline':>10}"
+        f"{'RSS KiB':>10}{'traced KiB':>12}{'blocks':>9}"
+    )
+    print(header)
+    for name, result in results.items():
+        previous = baseline.get(name, {}).get("us_per_item")
+        marker = ""
+        if previous and result["us_per_item"] > previous * (1 + args.threshold):
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(
+            f"{name:<42}{result['items']:>6}{result['items_per_sec']:>11.0f}"
+            f"{result['us_per_item']:>10.1f}{previous or 0:>10.1f}"
+            f"{result['peak_rss_kib']:>10}{result['peak_traced_kib']:>12.1f}"
+            f"{result['allocated_blocks']:>9}{marker}"
+        )
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {BASELINE_PATH}")
+    elif regressions:
+        raise SystemExit(
+            f"Slower than baseline by more than {args.threshold:.0%}: "
+            + ", ".join(regressions)
+        )
+
+
+if __name__ == "__main__":
+    main()
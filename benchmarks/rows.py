@@ -0,0 +1,59 @@
+"""
+Measure the per-row cost of parsing the boardbook meetings table, comparing the
+single-pass row extraction with running separate CSS queries for each field.
+
+    python -m benchmarks.rows [--number 200]
+"""
+
+import argparse
+import timeit
+from os.path import dirname, join
+
+from city_scrapers_core.utils import file_response
+
+from city_scrapers.spiders.fortx_Fort_Worth_Isd_Meetings import (
+    FortxFortWorthIsdMeetingsSpider,
+)
+
+FIXTURE = join(
+    dirname(dirname(__file__)), "tests", "files", "fortx_Fort_Worth_Isd_Meetings.html"
+)
+
+
+def extract_with_css(item):
+    """Extract row fields with a CSS query per field, as each helper used to"""
+    heading = item.css("td")[0].css("div::text").get()
+    # title and start each read the heading separately
+    item.css("td")[0].css("div::text").get()
+    lines = item.css("td")[1].css("span::text")
+    location = [lines[0].get(), lines[1].get(), lines[2].get()]
+    links = [
+        (link.css("::text").get(), link.css("::attr(href)").get())
+        for link in item.css("a")
+    ]
+    return heading, location, links
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=200, help="runs per case")
+    args = parser.parse_args()
+
+    response = file_response(FIXTURE)
+    spider = FortxFortWorthIsdMeetingsSpider()
+    rows = response.css("table tbody tr")
+
+    cases = [
+        ("css query per field", lambda: [extract_with_css(row) for row in rows]),
+        ("single-pass _parse_row", lambda: [spider._parse_row(row) for row in rows]),
+        ("full parse", lambda: list(spider.parse(response))),
+    ]
+    print(f"{len(rows)} rows from {FIXTURE}, {args.number} runs each")
+    for label, func in cases:
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3))
+        per_row = seconds / (args.number * len(rows)) * 1e6
+        print(f"{label:<26}{per_row:>8.1f} µs/row")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+"""
+Synthetic responses in the shapes each spider parses, scaled to any number of
+meetings, and a local HTTP server that serves them.
+
+Responses are keyed by the path and query string of the URL the spider requests,
+so the same requests a spider makes against the live sites can be answered
+locally. Content is deterministic for a given size.
+"""
+
+import json
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from city_scrapers.spiders.fortx_Fort_Worth_Boards import FortxFortWorthBoardsSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd import FortxFortWorthIsdSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd_Coc import FortxFortWorthIsdCocSpider
+from city_scrapers.spiders.fortx_Fort_Worth_Isd_Meetings import (
+    FortxFortWorthIsdMeetingsSpider,
+)
+from city_scrapers.spiders.fortx_Tarrant_County_Commissioners_Court import (
+    FortxTarrantCountyCommissionersCourtSpider,
+)
+
+FIRST_MEETING = datetime(2014, 1, 6, 9, 30)
+JSON = "application/json; charset=utf-8"
+HTML = "text/html; charset=utf-8"
+
+BOARDS = [
+    "City Plan Commission",
+    "Zoning Commission",
+    "Historic and Cultural Landmarks Commission",
+    "Board of Adjustment",
+    "DFW International Airport Board Operations Committee",
+    "Library Advisory Board",
+    "Park and Recreation Advisory Board",
+    "Tax Increment Reinvestment Zone No. 8 (Lancaster Corridor TIF)",
+    "Mayor's Committee on Persons with Disabilities (MCPD)",
+    "Special Called Meeting - Cancelled",
+]
+# Boardbook headings are split on "at", which none of these titles contain
+BOARDBOOK_TITLES = [
+    "Regular Board Meeting",
+    "Special Board Meeting",
+    "Board Work Session",
+    "Board Conference",
+    "Committee of the Whole",
+]
+VENUES = [
+    ("City Hall", "200 Texas St", "Fort Worth", "76102"),
+    ("Como Community Center", "4660 Horne Street", "Fort Worth", "76107"),
+    ("Board Room", "2400 Aviation Dr.", "DFW Airport", "75261"),
+    ("", "", "", ""),
+]
+
+
+def meeting_starts(size, days_apart=1):
+    """Return size start times, a few per day, starting from FIRST_MEETING"""
+    return [
+        FIRST_MEETING + timedelta(days=idx // 3 * days_apart, hours=idx % 3 * 3)
+        for idx in range(size)
+    ]
+
+
+def path_key(url):
+    parts = urlsplit(url)
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128)))
+
+
+def boards_responses(size):
+    """getcalendaritems JSON with size items, and a contentinfo response for each
+    distinct content ID. Recurring meetings share content IDs like on the live site.
+    """
+    spider = FortxFortWorthBoardsSpider()
+    rng = random.Random(size)
+    calendar_id = "788ffb59-05d1-457d-b9dd-423d4b95a06e"
+    contents = [
+        (_uuid(rng), title) for title in BOARDS for _ in range(max(size // 40, 1))
+    ]
+    days = {}
+    responses = {}
+    for start in meeting_starts(size):
+        content_id, title = rng.choice(contents)
+        item = {
+            "CalendarId": calendar_id,
+            "Id": content_id,
+            "MainContentId": content_id,
+            "Name": title,
+            "DateTime": start.strftime("%-d/%-m/%Y %-I:%M:%S %p"),
+        }
+        day = days.setdefault(
+            start.date(),
+            {
+                "Date": start.strftime("%d/%m/%Y"),
+                "DD": start.day,
+                "MM": start.month,
+                "YYYY": start.year,
+                "Items": [],
+                "Day": start.strftime("%A"),
+                "Month": start.strftime("%B"),
+            },
+        )
+        day["Items"].append(item)
+        info_url = spider._parse_info_url(item)
+        if path_key(info_url) not in responses:
+            venue, street, suburb, postcode = rng.choice(VENUES)
+            info = {
+                "data": {
+                    "Title": title,
+                    "Description": title,
+                    "Link": f"https://www.fortworthtexas.gov/events/{content_id}",
+                    "Image": None,
+                    "AltText": None,
+                    "Address": {
+                        "Venue": venue,
+                        "Street": street,
+                        "Suburb": suburb,
+                        "PostCode": postcode,
+                        "Formatted": ", ".join(
+                            v for v in (venue, street, suburb, postcode) if v
+                        ),
+                    },
+                    "AdditionalInfo": [],
+                    "IsCancelled": False,
+                },
+                "success": True,
+            }
+            responses[path_key(info_url)] = (JSON, json.dumps(info).encode())
+    calendar = {"data": list(days.values()), "success": True}
+    responses[path_key(spider.start_urls[0])] = (JSON, json.dumps(calendar).encode())
+    return responses
+
+
+def tarrant_responses(size):
+    """readArchived JSON with size meetings, and a short readCurrentAndUpcoming"""
+    spider = FortxTarrantCountyCommissionersCourtSpider
+    rng = random.Random(size)
+
+    def meeting(start):
+        return {
+            "id": _uuid(rng),
+            "meetingStartDateTime": start.isoformat(),
+            "meetingStartDateTimeDisplay": f"{start.month}/{start.day}/{start.year}",
+            "meetingEndDateTime": (start + timedelta(hours=3)).isoformat(),
+            "meetingType": "Commissioners Court",
+            "description": rng.choice(
+                ["Commissioners Court", "Commissioners Court Work Session"]
+            ),
+            "meetingStatus": "Finalized",
+            "isPublished": True,
+            "agendaAttachmentId": _uuid(rng),
+            "minutesAttachmentId": _uuid(rng) if rng.random() < 0.8 else None,
+            "hasAgenda": True,
+            "hasMinutes": True,
+            "videoId": "BSjaTEIkv1s" if rng.random() < 0.5 else None,
+        }
+
+    archived = [meeting(start) for start in meeting_starts(size)]
+    upcoming_start = datetime.now().replace(hour=10, minute=0, second=0, microsecond=0)
+    upcoming = [meeting(upcoming_start + timedelta(weeks=idx)) for idx in range(4)]
+    return {
+        path_key(url): (
+            JSON,
+            json.dumps(
+                {
+                    "data": data,
+                    "total": len(data),
+                    "aggregateResults": None,
+                    "errors": None,
+                }
+            ).encode(),
+        )
+        for url, data in zip(spider.start_urls, [archived, upcoming])
+    }
+
+
+def isd_responses(size):
+    """FWISD board calendar HTML with a .fsStateHasEvents day for each meeting"""
+    days = []
+    for start in meeting_starts(size):
+        end = start + timedelta(hours=1)
+        title = escape(f"{BOARDS[start.day % len(BOARDS)]} Board Meeting")
+        days.append(
+            '<div class="fsCalendarDaybox fsStateHasEvents">'
+            f'<div class="fsCalendarDate" data-day="{start.day}" '
+            f'data-year="{start.year}" data-month="{start.month - 1}">'
+            f'{start.strftime("%A, %B %-d")}</div>'
+            '<div class="fsCalendarInfo fsCalendarEvent">'
+            f'<a class="fsCalendarTitle fsCalendarEventLink" href="#">{title}</a>'
+            '<div class="fsTimeRange">'
+            f'<time datetime="{start.isoformat()}-05:00" class="fsStartTime">'
+            f'{start.strftime("%-I:%M %p")}</time> - '
+            f'<time datetime="{end.isoformat()}-05:00" class="fsEndTime">'
+            f'{end.strftime("%-I:%M %p")}</time></div>'
+            '<div class="fsLocation">Fort Worth ISD District Service Center</div>'
+            "</div></div>"
+        )
+    body = _html_page('<div class="fsCalendarMonthBrowser">' + "".join(days) + "</div>")
+    return {path_key(FortxFortWorthIsdSpider.start_urls[0]): (HTML, body)}
+
+
+def isd_coc_responses(size):
+    """FWISD oversight committee page with a past meetings table and calendar
+    with about a quarter of the meetings each, some of them on the same day
+    """
+    starts = [start.replace(hour=18, minute=0) for start in meeting_starts(size, 7)]
+    past, upcoming = starts[: size * 3 // 4], starts[size * 3 // 4 :]
+    rows = []
+    for start in reversed(past):
+        links = "".join(
+            f'<td><a href="/fs/resource-manager/view/{start:%Y%m%d}-{name}">{name}</a>'
+            "</td>"
+            for name in ("Agenda", "Presentation", "Minutes")
+        )
+        rows.append(f"<tr><td>{start:%B %-d, %Y}</td>{links}</tr>")
+    days = []
+    for start in upcoming:
+        end = start + timedelta(hours=1)
+        days.append(
+            '<div class="fsDayContainer"><article>'
+            '<div class="fsTitle"><a class="fsCalendarEventLink" href="#">'
+            "2021 Citizens Oversight Committee Meeting</a></div>"
+            '<div class="fsEventDetails"><div class="fsTimeRange">'
+            f'<time datetime="{start.isoformat()}-05:00" class="fsStartTime">'
+            "6:00 PM</time> - "
+            f'<time datetime="{end.isoformat()}-05:00" class="fsEndTime">'
+            "7:00 PM</time></div></div></article></div>"
+        )
+    body = _html_page(
+        '<table border="1"><tbody>'
+        + "".join(rows)
+        + "</tbody></table>"
+        + '<div class="fsCalendar">'
+        + "".join(days)
+        + "</div>"
+    )
+    return {path_key(FortxFortWorthIsdCocSpider.start_urls[0]): (HTML, body)}
+
+
+def isd_meetings_responses(size):
+    """Boardbook organization page with a table row for each meeting"""
+    rows = []
+    for idx, start in enumerate(meeting_starts(size)):
+        meeting_id = 600000 + idx
+        title = escape(BOARDBOOK_TITLES[idx % len(BOARDBOOK_TITLES)])
+        rows.append(
+            '<tr class=" row-for-board"><td><div>'
+            f'{start.strftime("%B %d, %Y at %-I:%M %p")} - {title}</div>'
+            '<div class="margin-top-10"><b>Meeting Type:</b> Regular</div></td>'
+            "<td><div><span>Fort Worth ISD District Service Center</span><br>"
+            "<span>7060 Camp Bowie Blvd.</span><br><span>Fort Worth, TX 76116</span> "
+            '<span class="nowrap">['
+            '<a href="https://maps.google.com/?q=7060+Camp+Bowie">'
+            '<i class="fa fa-globe"></i> map it</a>]</span></div></td>'
+            '<td class="nowrap"><ul class="list-unstyled">'
+            f'<li><a href="/Public/PublicNotice/733?meeting={meeting_id}">'
+            "Public Notice</a></li>"
+            f'<li><a href="/Public/Agenda/733?meeting={meeting_id}">Agenda</a></li>'
+            "</ul></td></tr>"
+        )
+    body = _html_page(
+        '<table class="table"><thead><tr><th>Meeting</th><th>Location</th>'
+        "<th>Documents</th></tr></thead><tbody>" + "".join(rows) + "</tbody></table>"
+    )
+    return {path_key(FortxFortWorthIsdMeetingsSpider.start_urls[0]): (HTML, body)}
+
+
+def _html_page(content):
+    return (
+        "<!DOCTYPE html><html><head><title>Synthetic</title></head><body>"
+        f"<main>{content}</main></body></html>"
+    ).encode()
+
+
+GENERATORS = {
+    FortxFortWorthBoardsSpider.name: boards_responses,
+    FortxFortWorthIsdSpider.name: isd_responses,
+    FortxFortWorthIsdCocSpider.name: isd_coc_responses,
+    FortxFortWorthIsdMeetingsSpider.name: isd_meetings_responses,
+    FortxTarrantCountyCommissionersCourtSpider.name: tarrant_responses,
+}
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Local HTTP server answering GET and POST requests from a dict of responses
+    keyed by path and query string, with a 404 for anything else
+    """
+
+    daemon_threads = True
+
+    def __init__(self, responses, port=0):
+        self.responses = responses
+        self.requests = 0
+        super().__init__(("127.0.0.1", port), StandInHandler)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests += 1
+        content_type, body = self.server.responses.get(self.path, (None, None))
+        if body is None:
+            content_type, body = "text/plain", b"Not found"
+            self.send_response(404)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.do_GET()
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,131 @@
+import logging
+import os
+
+from scrapy.commands import ScrapyCommand
+from scrapy.crawler import Crawler
+from scrapy.exceptions import UsageError
+from twisted.internet.defer import Deferred, DeferredList, DeferredSemaphore
+
+logger = logging.getLogger(__name__)
+
+
+class Command(ScrapyCommand):
+    """Run every spider in the project concurrently inside a single process.
+
+    Replaces launching one ``scrapy crawl`` process per spider, so interpreter
+    startup, imports, settings and pipeline setup are only paid once and the run
+    takes about as long as the slowest spider.
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "[options] [<spider> ...]"
+
+    def short_desc(self):
+        return "Run all (or the given) spiders concurrently in one process"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "-c",
+            "--concurrency",
+            dest="concurrency",
+            type=int,
+            default=None,
+            help="maximum number of spiders to run at once (default: "
+            "CITY_SCRAPERS_CRAWLALL_CONCURRENCY, 0 for no limit)",
+        )
+        parser.add_argument(
+            "-d",
+            "--output-dir",
+            dest="output_dir",
+            default=None,
+            help="write each spider's items to its own feed file in this directory",
+        )
+
+    def run(self, args, opts):
+        spider_list = self.crawler_process.spider_loader.list()
+        unknown = [spider for spider in args if spider not in spider_list]
+        if unknown:
+            raise UsageError(f"Unknown spiders: {', '.join(unknown)}")
+        spiders = args or spider_list
+
+        concurrency = opts.concurrency
+        if concurrency is None:
+            concurrency = self.settings.getint("CITY_SCRAPERS_CRAWLALL_CONCURRENCY")
+        if concurrency <= 0:
+            concurrency = len(spiders)
+        semaphore = DeferredSemaphore(max(concurrency, 1))
+
+        crawlers = {}
+        dfds = []
+        for spider_name in spiders:
+            crawler = self._create_crawler(spider_name, opts.output_dir)
+            crawlers[spider_name] = crawler
+            dfds.append(semaphore.run(self._crawl, crawler))
+
+        # Stop the reactor once every queued crawl has finished rather than relying
+        # on CrawlerProcess.join, which only tracks crawls that have already started
+        from twisted.internet import reactor
+
+        results = DeferredList(dfds, consumeErrors=True)
+        results.addBoth(self._collect_results, spiders, crawlers)
+        results.addBoth(lambda _: reactor.stop())
+        self.crawler_process.start(stop_after_crawl=False)
+
+    def _crawl(self, crawler):
+        """Start a crawl, returning a Deferred that fires when it's finished"""
+        result = self.crawler_process.crawl(crawler)
+        # Newer Scrapy versions return an asyncio task from AsyncCrawlerProcess
+        if not isinstance(result, Deferred):
+            result = Deferred.fromFuture(result)
+        return result
+
+    def _create_crawler(self, spider_name, output_dir):
+        """Create a crawler with its own copy of the settings and output feed"""
+        spidercls = self.crawler_process.spider_loader.load(spider_name)
+        settings = self.settings.copy()
+        if output_dir:
+            feed_format = settings.get("FEED_FORMAT") or "jsonlines"
+            feed_path = os.path.join(output_dir, f"{spider_name}.{feed_format}")
+            settings.set("FEEDS", {feed_path: {"format": feed_format}}, "cmdline")
+        return Crawler(spidercls, settings)
+
+    def _collect_results(self, results, spiders, crawlers):
+        """Log a status line for each spider and set a combined exit code"""
+        failed = []
+        for spider_name, (success, result) in zip(spiders, results):
+            stats = crawlers[spider_name].stats
+            if not success:
+                reason = f"failed to start: {result.getErrorMessage()}"
+            else:
+                reason = spider_failure_reason(stats.get_stats() if stats else {})
+            if reason:
+                failed.append(spider_name)
+                logger.error("Spider %s %s", spider_name, reason)
+            else:
+                logger.info("Spider %s finished", spider_name)
+        if failed:
+            self.exitcode = 1
+        logger.info(
+            "Ran %d spiders, %d failed%s",
+            len(spiders),
+            len(failed),
+            f": {', '.join(failed)}" if failed else "",
+        )
+
+
+def spider_failure_reason(stats):
+    """Return why a finished crawl should count as a failure, or None if it didn't
+
+    :param stats: Crawler stats dictionary collected after the spider closed
+    :return: Failure description or None
+    """
+    finish_reason = stats.get("finish_reason")
+    if finish_reason != "finished":
+        return f"closed with reason {finish_reason!r}"
+    error_count = stats.get("log_count/ERROR", 0)
+    if error_count:
+        return f"logged {error_count} errors"
+    return None
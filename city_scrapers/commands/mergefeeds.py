@@ -0,0 +1,252 @@
+import glob
+import gzip
+import heapq
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from operator import itemgetter
+
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from city_scrapers.exporters import INDEX_SUFFIX
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class Command(ScrapyCommand):
+    """Merge the latest local feed of each spider into latest.json and upcoming.json.
+
+    A local alternative to ``scrapy combinefeeds``, which only reads feeds from cloud
+    storage, for feeds written with ``scrapy crawlall -d``. Feeds are sorted by
+    start time in a process pool, one piece at a time: chunked feeds with an index
+    are read by seeking to each compressed chunk it lists, and other feeds are read
+    in batches of lines. Each sorted piece is written to a run file, and the runs
+    are merged in a single streaming pass that writes both outputs, so memory use
+    doesn't depend on the size of the feeds.
+    """
+
+    requires_project = True
+
+    def syntax(self):
+        return "[options] <feed dir>"
+
+    def short_desc(self):
+        return "Merge local spider feeds into latest.json and upcoming.json"
+
+    def add_options(self, parser):
+        ScrapyCommand.add_options(self, parser)
+        parser.add_argument(
+            "-o",
+            "--output-dir",
+            dest="output_dir",
+            default=None,
+            help="directory to write latest.json and upcoming.json to (default: "
+            "the feed directory)",
+        )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            dest="jobs",
+            type=int,
+            default=None,
+            help="number of processes sorting feeds (default: number of CPUs)",
+        )
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        feed_dir = args[0]
+        output_dir = opts.output_dir or feed_dir
+        feed_paths = self.get_spider_feeds(feed_dir)
+        if not feed_paths:
+            raise UsageError(f"No spider feeds found in {feed_dir}")
+
+        start_time = time.monotonic()
+        with tempfile.TemporaryDirectory() as run_dir:
+            run_prefixes = [
+                os.path.join(run_dir, str(idx)) for idx in range(len(feed_paths))
+            ]
+            with ProcessPoolExecutor(opts.jobs) as executor:
+                run_paths = [
+                    path
+                    for feed_runs in executor.map(
+                        sort_feed,
+                        feed_paths,
+                        run_prefixes,
+                        [self.start_key] * len(feed_paths),
+                    )
+                    for path in feed_runs
+                ]
+            sorted_time = time.monotonic()
+            upcoming_after = (datetime.now() - timedelta(days=1)).isoformat()[:19]
+            total, upcoming = merge_runs(run_paths, output_dir, upcoming_after)
+        elapsed = time.monotonic() - start_time
+
+        feed_bytes = sum(os.path.getsize(path) for path in feed_paths)
+        print(
+            f"Merged {total} meetings ({upcoming} upcoming) from {len(feed_paths)} "
+            f"feeds in {elapsed:.2f}s (sorted in {sorted_time - start_time:.2f}s): "
+            f"{total / elapsed:.0f} meetings/s, {feed_bytes / elapsed / 1e6:.2f} MB/s"
+        )
+
+    def get_spider_feeds(self, feed_dir):
+        """Get the most recently written feed for each spider in a directory"""
+        feed_paths = []
+        for spider in self.crawler_process.spider_loader.list():
+            spider_paths = [
+                path
+                for path in glob.glob(os.path.join(feed_dir, f"{spider}.*"))
+                if not path.endswith((INDEX_SUFFIX, ".tmp"))
+            ]
+            if spider_paths:
+                feed_paths.append(max(spider_paths, key=os.path.getmtime))
+        return feed_paths
+
+    @property
+    def start_key(self):
+        pipelines = self.settings.get("ITEM_PIPELINES", {})
+        if "city_scrapers_core.pipelines.OpenCivicDataPipeline" in pipelines:
+            return "start_time"
+        return "start"
+
+
+# Lines sorted in memory at a time for feeds without an index
+BATCH_SIZE = 10000
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def open_feed(path):
+    """Open a JSON lines feed as text, decompressing gzip and zstd feeds"""
+    with open(path, "rb") as f:
+        magic = f.read(4)
+    if magic.startswith(GZIP_MAGIC):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raise UsageError(f"zstandard must be installed to read {path}")
+        return zstandard.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def load_index(feed_path):
+    """Load the chunk index written next to a chunked feed, or return None if there
+    isn't one or it doesn't match the feed
+    """
+    try:
+        with open(f"{feed_path}{INDEX_SUFFIX}", encoding="utf-8") as f:
+            index = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    chunks = index.get("chunks") or []
+    if not chunks or chunks[-1]["offset"] + chunks[-1]["length"] != os.path.getsize(
+        feed_path
+    ):
+        return None
+    if index.get("compression") == "zstd" and zstandard is None:
+        return None
+    return index
+
+
+def read_pieces(feed_path, batch_size=BATCH_SIZE):
+    """Yield a feed's lines in lists small enough to sort in memory
+
+    Feeds with an index are read one compressed chunk at a time by seeking to the
+    chunk's offset, and other feeds batch_size lines at a time.
+
+    :param feed_path: Path to a spider's JSON lines feed
+    :param batch_size: Number of lines in each list for feeds without an index
+    """
+    index = load_index(feed_path)
+    if index is not None:
+        with open(feed_path, "rb") as f:
+            for chunk in index["chunks"]:
+                f.seek(chunk["offset"])
+                data = f.read(chunk["length"])
+                if index["compression"] == "zstd":
+                    data = zstandard.ZstdDecompressor().decompress(data)
+                else:
+                    data = gzip.decompress(data)
+                yield [line for line in data.decode("utf-8").splitlines() if line]
+        return
+    with open_feed(feed_path) as f:
+        batch = []
+        for line in f:
+            line = line.strip()
+            if line:
+                batch.append(line)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def sort_feed(feed_path, run_prefix, start_key):
+    """Write a feed's meetings to tab-separated run files, each sorted by start time
+
+    Each line of a run file is a meeting's start time followed by its original
+    JSON, so the merge doesn't need to parse meetings again.
+
+    :param feed_path: Path to a spider's JSON lines feed
+    :param run_prefix: Path prefix of the run files to write
+    :param start_key: Name of the meeting field with the start time
+    :return: List of run file paths
+    """
+    run_paths = []
+    for piece in read_pieces(feed_path):
+        meetings = []
+        for line in piece:
+            start = json.loads(line).get(start_key) or ""
+            # Feeds may separate the date and time with either a space or "T"
+            meetings.append((start[:19].replace(" ", "T"), line))
+        meetings.sort(key=itemgetter(0))
+        run_path = f"{run_prefix}-{len(run_paths)}.tsv"
+        with open(run_path, "w", encoding="utf-8") as f:
+            for start, line in meetings:
+                f.write(f"{start}\t{line}\n")
+        run_paths.append(run_path)
+    return run_paths
+
+
+def read_run(run_path):
+    with open(run_path, encoding="utf-8") as f:
+        for line in f:
+            start, _, meeting = line.rstrip("\n").partition("\t")
+            yield start, meeting
+
+
+def merge_runs(run_paths, output_dir, upcoming_after):
+    """Merge sorted runs into latest.json, and upcoming.json for meetings starting
+    after upcoming_after
+
+    :param run_paths: Paths to run files written by sort_feed
+    :param output_dir: Directory to write outputs to
+    :param upcoming_after: ISO datetime string, meetings starting later are upcoming
+    :return: Tuple of the number of meetings and number of upcoming meetings
+    """
+    latest_path = os.path.join(output_dir, "latest.json")
+    upcoming_path = os.path.join(output_dir, "upcoming.json")
+    total = 0
+    upcoming = 0
+    with open(f"{latest_path}.tmp", "w", encoding="utf-8") as latest_file, open(
+        f"{upcoming_path}.tmp", "w", encoding="utf-8"
+    ) as upcoming_file:
+        merged = heapq.merge(*[read_run(path) for path in run_paths], key=itemgetter(0))
+        for start, meeting in merged:
+            # Match combinefeeds, which separates meetings without a trailing newline
+            latest_file.write(f"\n{meeting}" if total else meeting)
+            total += 1
+            if start > upcoming_after:
+                upcoming_file.write(f"\n{meeting}" if upcoming else meeting)
+                upcoming += 1
+    os.replace(f"{latest_path}.tmp", latest_path)
+    os.replace(f"{upcoming_path}.tmp", upcoming_path)
+    return total, upcoming
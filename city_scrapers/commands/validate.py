@@ -0,0 +1,5 @@
+from city_scrapers_core.commands.validate import Command as CoreCommand
+
+
+class Command(CoreCommand):
+    """Expose the city_scrapers_core command from the project COMMANDS_MODULE"""
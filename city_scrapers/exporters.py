@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+
+from scrapy.exporters import BaseItemExporter
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+INDEX_SUFFIX = ".idx.json"
+
+
+def item_spider(item):
+    """Return the name of the spider that scraped an item based on its ID"""
+    extras = item.get("extras") or item.get("extra") or {}
+    item_id = item.get("id") or extras.get("cityscrapers.org/id") or ""
+    return item_id.split("/")[0] or None
+
+
+class CompressedJsonLinesItemExporter(BaseItemExporter):
+    """Writes JSON lines compressed with gzip, or zstd if the compression option is
+    set to "zstd" and the zstandard package is installed.
+
+    Lines are buffered and written as independently compressed gzip members or zstd
+    frames of about chunk_size bytes, so memory use doesn't grow with the feed and
+    the output can still be read as a single stream. Each chunk only contains one
+    spider's items. If the feed is written to a local file, an index next to it
+    (with a .idx.json suffix) lists each chunk's byte offset, length, spider, item
+    count and earliest and latest start so readers can seek to what they need.
+
+    Items are serialized with orjson if it's installed.
+    """
+
+    def __init__(self, file, **kwargs):
+        self.compression = kwargs.pop("compression", "gzip")
+        self.chunk_size = kwargs.pop("chunk_size", 256 * 1024)
+        super().__init__(dont_fail=True, **kwargs)
+        if self.compression == "zstd" and zstandard is None:
+            self.compression = "gzip"
+        self.file = file
+        self.encoder = ScrapyJSONEncoder(**self._kwargs)
+        self.chunks = []
+        self._buffer = []
+        self._buffer_size = 0
+        self._chunk = None
+
+    def start_exporting(self):
+        self._offset = self.file.tell() if self.file.seekable() else 0
+
+    def export_item(self, item):
+        fields = dict(self._get_serialized_fields(item))
+        spider = item_spider(fields)
+        if self._chunk is not None and spider != self._chunk["spider"]:
+            self._flush()
+        if self._chunk is None:
+            self._chunk = {
+                "spider": spider,
+                "items": 0,
+                "min_start": None,
+                "max_start": None,
+            }
+        line = self._serialize(fields)
+        self._buffer.append(line)
+        self._buffer_size += len(line)
+        self._update_chunk(fields)
+        if self._buffer_size >= self.chunk_size:
+            self._flush()
+
+    def finish_exporting(self):
+        self._flush()
+        # Remote feed storages write to a temporary file that's deleted after upload
+        path = getattr(self.file, "name", None)
+        if isinstance(path, str) and not getattr(self.file, "delete", False):
+            self._write_index(path)
+
+    def _serialize(self, fields):
+        if orjson is not None:
+            return orjson.dumps(
+                fields,
+                default=self.encoder.default,
+                option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+        return (self.encoder.encode(fields) + "\n").encode(self.encoding or "utf-8")
+
+    def _update_chunk(self, fields):
+        chunk = self._chunk
+        chunk["items"] += 1
+        start = fields.get("start") or fields.get("start_time")
+        if start is not None:
+            # Match the format the start is written in
+            if not isinstance(start, str):
+                start = self.encoder.default(start)
+            if chunk["min_start"] is None or start < chunk["min_start"]:
+                chunk["min_start"] = start
+            if chunk["max_start"] is None or start > chunk["max_start"]:
+                chunk["max_start"] = start
+
+    def _flush(self):
+        """Compress and write the buffered lines as a single chunk"""
+        if not self._buffer:
+            return
+        data = b"".join(self._buffer)
+        if self.compression == "zstd":
+            compressed = zstandard.ZstdCompressor().compress(data)
+        else:
+            compressed = gzip.compress(data, mtime=0)
+        self.file.write(compressed)
+        self.chunks.append(
+            {"offset": self._offset, "length": len(compressed), **self._chunk}
+        )
+        self._offset += len(compressed)
+        self._buffer = []
+        self._buffer_size = 0
+        self._chunk = None
+
+    def _write_index(self, path):
+        spiders = {}
+        for idx, chunk in enumerate(self.chunks):
+            summary = spiders.setdefault(
+                chunk["spider"],
+                {"items": 0, "chunks": [], "min_start": None, "max_start": None},
+            )
+            summary["items"] += chunk["items"]
+            summary["chunks"].append(idx)
+            for key, pick in (("min_start", min), ("max_start", max)):
+                values = [v for v in (summary[key], chunk[key]) if v is not None]
+                summary[key] = pick(values) if values else None
+        index = {
+            "compression": self.compression,
+            "items": sum(chunk["items"] for chunk in self.chunks),
+            "chunks": self.chunks,
+            "spiders": spiders,
+        }
+        tmp_path = f"{path}{INDEX_SUFFIX}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, f"{path}{INDEX_SUFFIX}")
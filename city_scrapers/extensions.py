@@ -0,0 +1,176 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+
+class SelectorStatsExtension:
+    """Add evaluation counts and times for a spider's selector registry to stats
+
+    Counters are reset when the spider opens, so stats only cover the current crawl.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler.stats)
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        selectors = getattr(spider, "selectors", None)
+        if selectors is not None:
+            selectors.reset()
+
+    def spider_closed(self, spider):
+        selectors = getattr(spider, "selectors", None)
+        if selectors is not None:
+            selectors.record_stats(self.stats, spider=spider)
+
+
+class HotPathProfilerExtension:
+    """Sampling profiler for finding where a spider's time goes in production.
+
+    Enabled with the CITY_SCRAPERS_PROFILE setting. While the spider is open, a
+    background thread samples the stack of the thread running the crawl every
+    CITY_SCRAPERS_PROFILE_INTERVAL seconds. Samples that include the spider are
+    attributed to it, so spiders run together with crawlall are profiled
+    separately.
+
+    Estimated time per callback, spider method and item pipeline is added to the
+    crawler stats along with total download latency, and all samples are written
+    as collapsed stacks to CITY_SCRAPERS_PROFILE_DIR for flame graph tools like
+    flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, stats, interval, output_dir):
+        self.stats = stats
+        self.interval = interval
+        self.output_dir = output_dir
+        self.stacks = Counter()
+        self.callbacks = Counter()
+        self.methods = Counter()
+        self.pipelines = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("CITY_SCRAPERS_PROFILE"):
+            raise NotConfigured
+        extension = cls(
+            crawler.stats,
+            settings.getfloat("CITY_SCRAPERS_PROFILE_INTERVAL", 0.005),
+            settings.get("CITY_SCRAPERS_PROFILE_DIR", "profiles"),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(
+            extension.response_received, signal=signals.response_received
+        )
+        return extension
+
+    def spider_opened(self, spider):
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample,
+            args=(threading.get_ident(), spider),
+            name=f"profiler-{spider.name}",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def spider_closed(self, spider):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._record_stats(spider)
+        self._write_stacks(spider)
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            self.stats.inc_value("profile/download/count", spider=spider)
+            self.stats.inc_value(
+                "profile/download/latency_ms", round(latency * 1000, 3), spider=spider
+            )
+
+    def _sample(self, thread_id, spider):
+        """Record the crawl thread's stack until the spider closes"""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._add_sample(frame, spider)
+
+    def _add_sample(self, frame, spider):
+        """Attribute a stack sample to callbacks, spider methods and pipelines"""
+        frames = []
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        frames.reverse()
+
+        spider_methods = []
+        pipeline = None
+        for stack_frame in frames:
+            frame_locals = stack_frame.f_locals
+            owner = frame_locals.get("self")
+            if owner is spider:
+                spider_methods.append(stack_frame.f_code.co_name)
+            elif (
+                stack_frame.f_code.co_name == "process_item"
+                and frame_locals.get("spider") is spider
+            ):
+                pipeline = type(owner).__name__
+        if not spider_methods and pipeline is None:
+            return
+
+        self.stacks[";".join(_frame_name(f) for f in frames)] += 1
+        if spider_methods:
+            self.callbacks[spider_methods[0]] += 1
+            self.methods[spider_methods[-1]] += 1
+        if pipeline is not None:
+            self.pipelines[pipeline] += 1
+
+    def _record_stats(self, spider):
+        self.stats.set_value(
+            "profile/samples", sum(self.stacks.values()), spider=spider
+        )
+        for prefix, counts in [
+            ("callback", self.callbacks),
+            ("spider_method", self.methods),
+            ("pipeline", self.pipelines),
+        ]:
+            for name, count in counts.items():
+                self.stats.set_value(
+                    f"profile/{prefix}/{name}/ms",
+                    round(count * self.interval * 1000, 1),
+                    spider=spider,
+                )
+
+    def _write_stacks(self, spider):
+        """Write samples as collapsed stacks, one "frame;frame;frame count" per line"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(
+            self.output_dir,
+            f"{spider.name}-{time.strftime('%Y%m%dT%H%M%S')}.folded",
+        )
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        self.stats.set_value("profile/output", path, spider=spider)
+
+
+def _frame_name(frame):
+    """Describe a frame as module:function for collapsed stack output"""
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_name}"
@@ -0,0 +1,301 @@
+import json
+import logging
+import os
+import sqlite3
+
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler, ScrapyAgent
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.httpobj import urlparse_cached
+from scrapy.utils.project import data_path
+from twisted.internet import defer
+from twisted.web.client import HTTPConnectionPool
+
+try:
+    from scrapy.core.downloader.handlers.http2 import H2DownloadHandler
+    from scrapy.core.http2.agent import H2ConnectionPool
+except ImportError:
+    H2DownloadHandler = None
+    H2ConnectionPool = None
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODES = ("record", "replay")
+
+
+class ConnectionCounter:
+    """Counts new and reused connections and TLS handshakes across connection pools,
+    recording them in crawler stats
+    """
+
+    def __init__(self, stats=None):
+        self.stats = stats
+        self.new = 0
+        self.reused = 0
+        self.tls_handshakes = 0
+
+    def count(self, reused, scheme):
+        if reused:
+            self.reused += 1
+            self._inc_stat("connections/reused")
+            return
+        self.new += 1
+        self._inc_stat("connections/new")
+        if scheme in ("https", b"https"):
+            self.tls_handshakes += 1
+            self._inc_stat("connections/tls_handshakes")
+
+    @property
+    def reuse_ratio(self):
+        total = self.new + self.reused
+        return round(self.reused / total, 3) if total else 0.0
+
+    def _inc_stat(self, key):
+        if self.stats is not None:
+            self.stats.inc_value(key)
+
+
+class InstrumentedConnectionPool(HTTPConnectionPool):
+    """Persistent connection pool that counts new and reused connections"""
+
+    def __init__(self, reactor, counter=None):
+        super().__init__(reactor, persistent=True)
+        self.counter = counter or ConnectionCounter()
+
+    def getConnection(self, key, endpoint):
+        connections = self._connections.get(key, [])
+        self.counter.count(
+            any(connection.state == "QUIESCENT" for connection in connections), key[0]
+        )
+        return super().getConnection(key, endpoint)
+
+
+if H2ConnectionPool is not None:
+
+    class InstrumentedH2ConnectionPool(H2ConnectionPool):
+        """HTTP/2 connection pool that counts new and reused connections. Requests
+        to a host share one connection, so every request after the first one that
+        connects is counted as reusing it.
+        """
+
+        def __init__(self, reactor, settings, counter=None):
+            super().__init__(reactor, settings)
+            self.counter = counter or ConnectionCounter()
+
+        def get_connection(self, key, uri, endpoint):
+            self.counter.count(
+                key in self._connections or key in self._pending_requests, key[0]
+            )
+            return super().get_connection(key, uri, endpoint)
+
+    class InstrumentedH2DownloadHandler(H2DownloadHandler):
+        """HTTP/2 download handler counting connections in a shared counter"""
+
+        def __init__(self, settings, crawler=None, counter=None):
+            super().__init__(settings, crawler)
+            from twisted.internet import reactor
+
+            self._pool = InstrumentedH2ConnectionPool(reactor, settings, counter)
+
+
+class PooledHTTPDownloadHandler(HTTP11DownloadHandler):
+    """HTTP/1.1 download handler with a tuned keep-alive connection pool.
+
+    Idle connections are kept for CITY_SCRAPERS_KEEPALIVE_TIMEOUT seconds, with up
+    to CITY_SCRAPERS_POOL_SIZE per host (CONCURRENT_REQUESTS_PER_DOMAIN by default).
+    Hosts in CITY_SCRAPERS_POOL_HOST_SIZES get their own pool of the given size. New
+    and reused connections, TLS handshakes and the reuse ratio are recorded in
+    crawler stats.
+
+    Requests to hosts in CITY_SCRAPERS_HTTP2_HOSTS are downloaded over HTTP/2 if
+    Scrapy's HTTP/2 support is installed, and counted in the same stats.
+    """
+
+    def __init__(self, settings, crawler=None):
+        super().__init__(settings, crawler)
+        from twisted.internet import reactor
+
+        self._counter = ConnectionCounter(crawler.stats if crawler else None)
+        self._pool = self._create_pool(
+            reactor,
+            settings,
+            settings.getint("CITY_SCRAPERS_POOL_SIZE")
+            or settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+        )
+        self._host_pools = {
+            host: self._create_pool(reactor, settings, int(size))
+            for host, size in settings.getdict("CITY_SCRAPERS_POOL_HOST_SIZES").items()
+        }
+
+        self._http2_hosts = set(settings.getlist("CITY_SCRAPERS_HTTP2_HOSTS"))
+        self._http2_handler = None
+        if self._http2_hosts:
+            if H2DownloadHandler is None:
+                logger.warning(
+                    "HTTP/2 is not available, install Twisted[http2] to use it for %s",
+                    ", ".join(sorted(self._http2_hosts)),
+                )
+            else:
+                self._http2_handler = InstrumentedH2DownloadHandler(
+                    settings, crawler, self._counter
+                )
+
+    def _create_pool(self, reactor, settings, size):
+        pool = InstrumentedConnectionPool(reactor, self._counter)
+        pool.maxPersistentPerHost = size
+        pool.cachedConnectionTimeout = settings.getint(
+            "CITY_SCRAPERS_KEEPALIVE_TIMEOUT", 240
+        )
+        pool._factory.noisy = False
+        return pool
+
+    def download_request(self, request, spider):
+        hostname = urlparse_cached(request).hostname
+        if (
+            self._http2_handler is not None
+            and urlparse_cached(request).scheme == "https"
+            and hostname in self._http2_hosts
+        ):
+            return self._http2_handler.download_request(request, spider)
+        if hostname not in self._host_pools:
+            return super().download_request(request, spider)
+        agent = ScrapyAgent(
+            contextFactory=self._contextFactory,
+            pool=self._host_pools[hostname],
+            maxsize=getattr(spider, "download_maxsize", self._default_maxsize),
+            warnsize=getattr(spider, "download_warnsize", self._default_warnsize),
+            fail_on_dataloss=self._fail_on_dataloss,
+            crawler=self._crawler,
+        )
+        return agent.download_request(request)
+
+    def close(self):
+        if self._crawler is not None:
+            self._crawler.stats.set_value(
+                "connections/reuse_ratio", self._counter.reuse_ratio
+            )
+        if self._http2_handler is not None:
+            self._http2_handler.close()
+        return defer.DeferredList(
+            [super().close()]
+            + [pool.closeCachedConnections() for pool in self._host_pools.values()]
+        )
+
+
+class RecordReplayDownloadHandler(HTTP11DownloadHandler):
+    """Records downloaded responses to a local archive, or serves them from it.
+
+    With CITY_SCRAPERS_REPLAY set to "record", every response is downloaded as usual
+    and stored in a SQLite archive for each spider, keyed by the request fingerprint
+    so requests that only differ by method or body (like Tarrant County's POST
+    requests) are stored separately. With it set to "replay", responses are served
+    from the archive without any network access, and requests that weren't recorded
+    are ignored.
+
+    Archives are written to CITY_SCRAPERS_REPLAY_DIR, or the project's .scrapy/replay
+    directory. State normally kept between runs is kept in a temporary directory
+    instead while recording or replaying (see state_path).
+    """
+
+    def __init__(self, settings, crawler=None):
+        super().__init__(settings, crawler)
+        self.mode = settings.get("CITY_SCRAPERS_REPLAY")
+        if self.mode not in REPLAY_MODES:
+            raise ValueError(
+                f"CITY_SCRAPERS_REPLAY must be one of {', '.join(REPLAY_MODES)}, "
+                f"not {self.mode!r}"
+            )
+        self.replay_dir = settings.get("CITY_SCRAPERS_REPLAY_DIR")
+        self.fingerprinter = crawler.request_fingerprinter if crawler else None
+        self.stats = crawler.stats if crawler else None
+        self._archives = {}
+
+    def download_request(self, request, spider):
+        if self.mode == "replay":
+            return self._replay(request, spider)
+        dfd = super().download_request(request, spider)
+        if self.mode == "record":
+            dfd.addCallback(self._record, request, spider)
+        return dfd
+
+    def _replay(self, request, spider):
+        row = (
+            self._archive(spider)
+            .execute(
+                "SELECT status, headers, body FROM responses WHERE fingerprint = ?",
+                (self._fingerprint(request),),
+            )
+            .fetchone()
+        )
+        if row is None:
+            self._inc_stat("replay/missing", spider)
+            return defer.fail(
+                IgnoreRequest(
+                    f"No recorded response for {request.method} {request.url}"
+                )
+            )
+        status, headers_json, body = row
+        headers = Headers(json.loads(headers_json))
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body)
+        self._inc_stat("replay/replayed", spider)
+        return defer.succeed(
+            respcls(
+                url=request.url,
+                status=status,
+                headers=headers,
+                body=body,
+                request=request,
+                flags=["replayed"],
+            )
+        )
+
+    def _record(self, response, request, spider):
+        headers = {
+            key.decode(): [value.decode("latin-1") for value in values]
+            for key, values in response.headers.items()
+        }
+        self._archive(spider).execute(
+            "REPLACE INTO responses (fingerprint, method, url, status, headers, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self._fingerprint(request),
+                request.method,
+                request.url,
+                response.status,
+                json.dumps(headers),
+                response.body,
+            ),
+        )
+        self._inc_stat("replay/recorded", spider)
+        return response
+
+    def _archive(self, spider):
+        if spider.name not in self._archives:
+            replay_dir = self.replay_dir or data_path("replay", createdir=True)
+            os.makedirs(replay_dir, exist_ok=True)
+            path = os.path.join(replay_dir, f"replay-{spider.name}.sqlite3")
+            # The http and https handlers each open the archive, so write each
+            # response immediately instead of holding a transaction open
+            conn = sqlite3.connect(path, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "fingerprint TEXT PRIMARY KEY, method TEXT NOT NULL, "
+                "url TEXT NOT NULL, status INTEGER NOT NULL, headers TEXT NOT NULL, "
+                "body BLOB NOT NULL)"
+            )
+            self._archives[spider.name] = conn
+        return self._archives[spider.name]
+
+    def _fingerprint(self, request):
+        return self.fingerprinter.fingerprint(request).hex()
+
+    def _inc_stat(self, key, spider):
+        if self.stats is not None:
+            self.stats.inc_value(key, spider=spider)
+
+    def close(self):
+        for conn in self._archives.values():
+            conn.close()
+        self._archives = {}
+        return super().close()
@@ -0,0 +1,61 @@
+import sys
+
+from city_scrapers_core.items import Meeting
+
+MEETING_FIELDS = tuple(Meeting.fields)
+_FIELD_SET = frozenset(MEETING_FIELDS)
+
+
+class MeetingRecord:
+    """Lightweight meeting used while a spider is building its items.
+
+    Stores the same fields as Meeting in slots instead of a dict, and supports the
+    item access that CityScrapersSpider._get_status and _get_id rely on. Titles are
+    interned since the same title is usually repeated across a spider's meetings.
+    Convert it with to_meeting when it's yielded.
+    """
+
+    __slots__ = MEETING_FIELDS
+
+    def __init__(self, **kwargs):
+        if isinstance(kwargs.get("title"), str):
+            kwargs["title"] = sys.intern(kwargs["title"])
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key not in _FIELD_SET:
+            raise KeyError(f"MeetingRecord does not support field: {key}")
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in _FIELD_SET and hasattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in _FIELD_SET else default
+
+    def to_meeting(self):
+        """Return a Meeting item with the fields that have been set"""
+        meeting = Meeting()
+        # Fields are already limited to Meeting's, so skip validating each one again
+        meeting._values.update(self._set_fields())
+        return meeting
+
+    def _set_fields(self):
+        for field in MEETING_FIELDS:
+            try:
+                yield field, getattr(self, field)
+            except AttributeError:
+                pass
+
+    def __repr__(self):
+        fields = ", ".join(f"{field}={value!r}" for field, value in self._set_fields())
+        return f"MeetingRecord({fields})"
@@ -1,24 +1,525 @@
-import random
+import hashlib
+import json
+import pickle
+import weakref
+import zlib
+from datetime import datetime, timedelta
 
+import scrapy
+from city_scrapers_core.constants import PASSED, TENTATIVE
 from city_scrapers_core.items import Meeting
+from scrapy import signals
+from scrapy.downloadermiddlewares.httpcache import HttpCacheMiddleware
+from scrapy.exceptions import NotConfigured
+from scrapy.extensions.httpcache import RFC2616Policy
+from scrapy.utils.request import request_from_dict
 from scrapy_wayback_middleware import WaybackMiddleware
+from scrapy_wayback_middleware.middleware import SLOT_KEY
+from twisted.internet import threads
+
+from city_scrapers.state import JsonStateStore, PickleStateStore
+from city_scrapers.wayback import WAYBACK_POST_URL, WAYBACK_SAVE_URL, WaybackQueue
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+
+def body_fingerprint(body):
+    """Return a fast non-cryptographic hash of a response body, using xxhash if it's
+    installed and CRC32 otherwise
+    """
+    if xxhash is not None:
+        return xxhash.xxh64_hexdigest(body)
+    return format(zlib.crc32(body), "08x")
 
 
 class CityScrapersWaybackMiddleware(WaybackMiddleware):
+    """Submits source pages and meeting documents to the Wayback Machine.
+
+    URLs are submitted at most once per run, and URLs that were archived within the
+    last CITY_SCRAPERS_WAYBACK_REARCHIVE_DAYS days are skipped based on timestamps
+    kept in the local state directory. URLs that haven't been archived before are
+    submitted first and with a higher request priority, and no more than
+    CITY_SCRAPERS_WAYBACK_BUDGET submissions are made per run (0 for no limit).
+
+    If CITY_SCRAPERS_WAYBACK_QUEUE is enabled, URLs are submitted by a WaybackQueue
+    running in background threads instead of through the crawl's own requests, and
+    URLs left unsent when the spider closes are saved and queued on the next run.
+    """
+
+    def __init__(self, crawler, is_post=False):
+        super().__init__(crawler, is_post=is_post)
+        settings = crawler.settings
+        self.stats = crawler.stats
+        self.budget = settings.getint("CITY_SCRAPERS_WAYBACK_BUDGET", 0)
+        self.rearchive_after = timedelta(
+            days=settings.getint("CITY_SCRAPERS_WAYBACK_REARCHIVE_DAYS", 30)
+        )
+        self.store = None
+        self.archived = {}
+        self.submitted = set()
+        self.queue = None
+        self.spool = None
+        crawler.signals.connect(self.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.spider_closed, signal=signals.spider_closed)
+
+    def spider_opened(self, spider):
+        self.store = JsonStateStore.from_settings(
+            self.crawler.settings, f"wayback-{spider.name}.json"
+        )
+        self.archived = self.store.load({})
+        if self.crawler.settings.getbool("CITY_SCRAPERS_WAYBACK_QUEUE"):
+            self._open_queue(spider)
+
+    def spider_closed(self, spider):
+        if self.queue is None:
+            self._save_archived()
+            return None
+        drain_timeout = self.crawler.settings.getfloat(
+            "CITY_SCRAPERS_WAYBACK_DRAIN_TIMEOUT", 300
+        )
+        dfd = threads.deferToThread(self.queue.close, timeout=drain_timeout)
+        dfd.addCallback(self._queue_closed, spider)
+        return dfd
+
+    def _save_archived(self):
+        if self.store is not None:
+            self.store.save(self.archived)
+
+    def _open_queue(self, spider):
+        settings = self.crawler.settings
+        self.queue = WaybackQueue(
+            endpoint=settings.get(
+                "CITY_SCRAPERS_WAYBACK_ENDPOINT",
+                WAYBACK_POST_URL if self.is_post else WAYBACK_SAVE_URL,
+            ),
+            is_post=self.is_post,
+            workers=settings.getint("CITY_SCRAPERS_WAYBACK_WORKERS", 4),
+            max_retries=settings.getint("CITY_SCRAPERS_WAYBACK_RETRIES", 3),
+            backoff=settings.getfloat("CITY_SCRAPERS_WAYBACK_BACKOFF", 2.0),
+            user_agent=settings.get("USER_AGENT"),
+            on_success=self._mark_archived,
+        )
+        self.spool = JsonStateStore.from_settings(
+            settings, f"wayback-spool-{spider.name}.json"
+        )
+        spooled = self.spool.load([])
+        self.submitted.update(spooled)
+        self.stats.set_value("wayback/queue/spooled_in", len(spooled), spider=spider)
+        self.queue.start()
+        for url in spooled:
+            self.queue.put(url)
+
+    def _queue_closed(self, pending, spider):
+        self.spool.save(pending)
+        for key, value in self.queue.counts.items():
+            self.stats.set_value(f"wayback/queue/{key}", value, spider=spider)
+        self.stats.set_value("wayback/queue/spooled_out", len(pending), spider=spider)
+        latencies = self.queue.latencies
+        if latencies:
+            self.stats.set_value(
+                "wayback/queue/latency_ms/avg",
+                round(sum(latencies) / len(latencies) * 1000, 1),
+                spider=spider,
+            )
+            self.stats.set_value(
+                "wayback/queue/latency_ms/max",
+                round(max(latencies) * 1000, 1),
+                spider=spider,
+            )
+        self._save_archived()
+
+    def _mark_archived(self, url):
+        self.archived[url] = datetime.now().isoformat()
+
     def get_item_urls(self, item):
-        MAX_LINKS = 3
         if isinstance(item, Meeting):
             links = []
             if "legistar" in item["source"] and "Calendar.aspx" not in item["source"]:
                 links = [item["source"]]
-            links.extend(
-                random.sample(
-                    [link.get("href") for link in item.get("links", [])], MAX_LINKS
-                )
-            )
+            links.extend(link.get("href") for link in item.get("links", []))
             return links
         if isinstance(item, dict):
-            return random.sample(
-                [doc.get("url") for doc in item.get("documents", [])], MAX_LINKS
-            )
+            return [doc.get("url") for doc in item.get("documents", [])]
         return []
+
+    def process_spider_output(self, response, result, spider):
+        """Process normally, submitting selected URLs to the Wayback Machine"""
+        wayback_urls = []
+        if response.request.method == "GET":
+            wayback_urls.append(response.url)
+        for item in result:
+            wayback_urls.extend(self.get_item_urls(item))
+            yield item
+        for wayback_url, is_new in self.select_urls(wayback_urls, spider):
+            if self.queue is not None:
+                self.queue.put(wayback_url)
+            else:
+                yield self.wayback_request(wayback_url, priority=int(is_new))
+
+    def select_urls(self, urls, spider):
+        """Return (url, is_new) pairs to submit, with new URLs first
+
+        :param urls: Candidate URLs in the order they were found
+        :param spider: Spider the URLs were found by
+        :return: List of URLs and whether each has never been archived
+        """
+        cutoff = (datetime.now() - self.rearchive_after).isoformat()
+        new_urls = []
+        stale_urls = []
+        for url in dict.fromkeys(urls):
+            if not url or not url.startswith("http") or "web.archive.org" in url:
+                continue
+            archived_at = self.archived.get(url)
+            if url in self.submitted:
+                self.stats.inc_value("wayback/skipped/duplicate", spider=spider)
+            elif archived_at is None:
+                new_urls.append((url, True))
+            elif archived_at < cutoff:
+                stale_urls.append((url, False))
+            else:
+                self.stats.inc_value("wayback/skipped/archived", spider=spider)
+        selected = new_urls + stale_urls
+        if self.budget:
+            remaining = max(self.budget - len(self.submitted), 0)
+            if len(selected) > remaining:
+                self.stats.inc_value(
+                    "wayback/skipped/budget", len(selected) - remaining, spider=spider
+                )
+                selected = selected[:remaining]
+        self.submitted.update(url for url, _ in selected)
+        self.stats.inc_value("wayback/submitted", len(selected), spider=spider)
+        return selected
+
+    def wayback_request(self, wayback_url, priority=0):
+        meta = {
+            "handle_httpstatus_list": [200, 429],
+            "dont_obey_robotstxt": True,
+            "dont_redirect": True,
+            "dont_retry": True,
+            "download_slot": SLOT_KEY,
+            "wayback_url": wayback_url,
+        }
+        if self.is_post:
+            return scrapy.Request(
+                "https://pragma.archivelab.org",
+                method="POST",
+                headers={"Content-Type": "application/json"},
+                body=json.dumps({"url": wayback_url}),
+                callback=self.handle_wayback,
+                meta=meta,
+                priority=priority,
+                dont_filter=True,
+            )
+        return scrapy.Request(
+            "https://web.archive.org/save/{}".format(wayback_url),
+            callback=self.handle_wayback,
+            meta=meta,
+            priority=priority,
+        )
+
+    def handle_wayback(self, response):
+        """Record the time each URL was successfully archived"""
+        if response.status == 200:
+            self._mark_archived(response.meta["wayback_url"])
+            self.stats.inc_value("wayback/archived", spider=self.crawler.spider)
+
+
+class ConditionalCachePolicy(RFC2616Policy):
+    """HTTP cache policy that revalidates every stored response with a conditional GET.
+
+    Responses are only stored if they have an ETag or Last-Modified validator, and
+    cached responses are never treated as fresh, so each request is sent with
+    If-None-Match and/or If-Modified-Since and the stored body is only reused when
+    the server returns 304 Not Modified.
+    """
+
+    def should_cache_response(self, response, request):
+        if response.status != 200:
+            return False
+        return b"ETag" in response.headers or b"Last-Modified" in response.headers
+
+    def is_cached_response_fresh(self, cachedresponse, request):
+        self._set_conditional_validators(request, cachedresponse)
+        return False
+
+    def is_cached_response_valid(self, cachedresponse, response, request):
+        return response.status == 304
+
+
+class ConditionalHttpCacheMiddleware(HttpCacheMiddleware):
+    """HttpCacheMiddleware that tracks conditional GET results in crawler stats.
+
+    Responses served from the cache after a 304 are flagged "not_modified", and
+    ContentHashMiddleware replays the previous run's output for them instead of
+    running the callback.
+    """
+
+    def process_response(self, request, response, spider):
+        cachedresponse = request.meta.get("cached_response")
+        response = super().process_response(request, response, spider)
+        if cachedresponse is not None and response is cachedresponse:
+            response.flags.append("not_modified")
+            self.stats.inc_value("httpcache/not_modified", spider=spider)
+            self.stats.inc_value(
+                "httpcache/bytes_saved", len(cachedresponse.body), spider=spider
+            )
+        return response
+
+
+class ContentHashMiddleware:
+    """Replays the previous run's output for responses whose body hasn't changed.
+
+    For spiders with replay_unchanged set, the items and requests each callback
+    outputs are stored along with a fingerprint of the response body. When a later
+    run gets a byte-identical response for the same request, the stored output is
+    returned and the callback is never run. Meetings are given a passed status if
+    they started since the output was stored.
+
+    Enabled with CITY_SCRAPERS_CONTENT_HASH. If only HTTPCACHE_ENABLED is set, output
+    is only replayed for responses that ConditionalHttpCacheMiddleware flagged
+    "not_modified" after a 304. CITY_SCRAPERS_FORCE_PARSE runs every callback while
+    still updating the stored output.
+    """
+
+    # Enabled instances by crawler, so callbacks can check for stored output before
+    # doing expensive work (see city_scrapers.offload)
+    _instances = weakref.WeakKeyDictionary()
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.force = crawler.settings.getbool("CITY_SCRAPERS_FORCE_PARSE")
+        self.compare_all = crawler.settings.getbool("CITY_SCRAPERS_CONTENT_HASH")
+        self.store = None
+        self.previous = {}
+        self.current = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not (
+            settings.getbool("CITY_SCRAPERS_CONTENT_HASH")
+            or settings.getbool("HTTPCACHE_ENABLED")
+        ):
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        cls._instances[crawler] = middleware
+        return middleware
+
+    @classmethod
+    def for_crawler(cls, crawler):
+        """Return the middleware enabled for a crawler, or None"""
+        return cls._instances.get(crawler)
+
+    def spider_opened(self, spider):
+        if not getattr(spider, "replay_unchanged", False):
+            return
+        self.store = PickleStateStore.from_settings(
+            self.crawler.settings, f"content-{spider.name}.pickle"
+        )
+        self.previous = self.store.load({})
+
+    def spider_closed(self, spider, reason):
+        if self.store is not None and reason == "finished":
+            self.store.save(self.current)
+
+    def replayable(self, response):
+        """Check whether the stored output will be replayed for a response instead of
+        the output of its callback
+        """
+        if self.store is None or response.request is None or self.force:
+            return False
+        cached = self.previous.get(self._cache_key(response.request))
+        return (
+            cached is not None
+            and cached[0] == body_fingerprint(response.body)
+            and (self.compare_all or "not_modified" in response.flags)
+        )
+
+    def process_spider_output(self, response, result, spider):
+        if self.store is None or response.request is None:
+            yield from result
+            return
+        key = self._cache_key(response.request)
+        if self.replayable(response):
+            cached = self.current[key] = self.previous[key]
+            self.stats.inc_value("contenthash/replayed", spider=spider)
+            if "not_modified" in response.flags:
+                self.stats.inc_value("contenthash/not_modified", spider=spider)
+            for output in cached[1]:
+                yield self._restore(output, spider)
+            return
+        fingerprint = body_fingerprint(response.body)
+        self.stats.inc_value("contenthash/parsed", spider=spider)
+        outputs = []
+        for output in result:
+            if outputs is not None:
+                outputs.append(self._serialize(output, spider))
+                if outputs[-1] is None:
+                    outputs = None
+            yield output
+        if outputs is not None:
+            self.current[key] = (fingerprint, outputs)
+
+    def _cache_key(self, request):
+        key = self.crawler.request_fingerprinter.fingerprint(request)
+        if request.cb_kwargs:
+            key += hashlib.sha1(pickle.dumps(request.cb_kwargs)).digest()
+        return key.hex()
+
+    def _serialize(self, output, spider):
+        """Return a picklable copy of a callback's output, or None if it can't be
+        stored
+        """
+        try:
+            if isinstance(output, scrapy.Request):
+                return ("request", pickle.dumps(output.to_dict(spider=spider)))
+            return ("item", pickle.dumps(output))
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError):
+            return None
+
+    def _restore(self, output, spider):
+        kind, data = output
+        if kind == "request":
+            return request_from_dict(pickle.loads(data), spider=spider)
+        item = pickle.loads(data)
+        if (
+            isinstance(item, Meeting)
+            and item.get("status") == TENTATIVE
+            and item["start"] < datetime.now()
+        ):
+            item["status"] = PASSED
+        return item
+
+
+class AdaptiveThrottleMiddleware:
+    """Sets the concurrency and delay of each domain's download slot from its own
+    latency and error history.
+
+    Replaces AutoThrottle's single target concurrency for every domain. A profile
+    of each domain's average latency, error rate and concurrency is kept in the
+    local state directory, so slots start from what worked on the previous run
+    instead of AUTOTHROTTLE_START_DELAY. Concurrency grows by about one request for
+    each round of successful responses, up to CONCURRENT_REQUESTS_PER_DOMAIN, and is
+    halved with the delay doubled on errors, 429s and 5xx responses. The delay
+    between requests is the average latency divided by the concurrency.
+
+    Enabled with CITY_SCRAPERS_ADAPTIVE_THROTTLE, which should be used instead of
+    AUTOTHROTTLE_ENABLED.
+    """
+
+    # Weight of the latest response in average latency and error rate
+    alpha = 0.3
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start_delay = settings.getfloat("AUTOTHROTTLE_START_DELAY", 5.0)
+        self.max_delay = settings.getfloat("AUTOTHROTTLE_MAX_DELAY", 60.0)
+        self.start_concurrency = settings.getfloat("AUTOTHROTTLE_TARGET_CONCURRENCY")
+        self.max_concurrency = settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN")
+        self.min_delay = settings.getfloat("DOWNLOAD_DELAY")
+        self.store = JsonStateStore.from_settings(settings, "throttle.json")
+        self.profiles = {}
+        self.updated = set()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_ADAPTIVE_THROTTLE"):
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        self.min_delay = getattr(spider, "download_delay", self.min_delay)
+        self.profiles = self.store.load({})
+        # Slots are created when a domain is first requested, so set the starting
+        # values of known domains in the downloader's per-slot settings
+        per_slot_settings = self.crawler.engine.downloader.per_slot_settings
+        for domain, profile in self.profiles.items():
+            per_slot_settings.setdefault(
+                domain,
+                {
+                    "concurrency": round(profile["concurrency"]),
+                    "delay": self._clamp_delay(profile["delay"]),
+                },
+            )
+
+    def spider_closed(self, spider):
+        for domain in sorted(self.updated):
+            profile = self.profiles[domain]
+            prefix = f"throttle/{domain}"
+            self.stats.set_value(
+                f"{prefix}/latency_ms", round(profile["latency"] * 1000), spider=spider
+            )
+            self.stats.set_value(
+                f"{prefix}/concurrency", round(profile["concurrency"]), spider=spider
+            )
+            self.stats.set_value(
+                f"{prefix}/delay_ms", round(profile["delay"] * 1000), spider=spider
+            )
+        # Other crawlers in the same run may have saved profiles for other domains
+        profiles = self.store.load({})
+        profiles.update({domain: self.profiles[domain] for domain in self.updated})
+        self.store.save(profiles)
+
+    def process_response(self, request, response, spider):
+        latency = request.meta.get("download_latency")
+        if latency is not None:
+            is_error = response.status == 429 or response.status >= 500
+            retry_after = response.headers.get("Retry-After", b"").decode()
+            self._update(request, spider, latency, is_error, retry_after)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._update(request, spider, None, True)
+
+    def _update(self, request, spider, latency, is_error, retry_after=None):
+        domain = request.meta.get("download_slot")
+        # Requests without a host, like data: URLs, use an empty slot key
+        if not domain or domain == SLOT_KEY:
+            return
+        profile = self.profiles.get(domain)
+        if profile is None:
+            profile = {
+                "latency": latency or self.start_delay,
+                "error_rate": 0.0,
+                "concurrency": max(self.start_concurrency, 1.0),
+                "delay": self.start_delay,
+            }
+            self.profiles[domain] = profile
+        self.updated.add(domain)
+
+        if latency is not None:
+            profile["latency"] += self.alpha * (latency - profile["latency"])
+        profile["error_rate"] += self.alpha * (int(is_error) - profile["error_rate"])
+        if is_error:
+            profile["concurrency"] = max(profile["concurrency"] / 2, 1.0)
+            delay = max(profile["delay"] * 2, profile["latency"])
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            self.stats.inc_value(f"throttle/{domain}/errors", spider=spider)
+        else:
+            profile["concurrency"] = min(
+                profile["concurrency"] + 1 / profile["concurrency"],
+                self.max_concurrency,
+            )
+            delay = profile["latency"] / profile["concurrency"]
+        profile["delay"] = self._clamp_delay(delay)
+        self.stats.inc_value(f"throttle/{domain}/requests", spider=spider)
+
+        slot = self.crawler.engine.downloader.slots.get(domain)
+        if slot is not None:
+            slot.concurrency = round(profile["concurrency"])
+            slot.delay = profile["delay"]
+
+    def _clamp_delay(self, delay):
+        return min(max(delay, self.min_delay), self.max_delay)
@@ -0,0 +1,66 @@
+from datetime import datetime
+from functools import lru_cache
+
+from scrapy import signals
+
+
+class MemoizedMeetingMixin:
+    """Caches the meeting IDs and statuses generated by CityScrapersSpider.
+
+    Archive pages repeat the same meetings and the same titles and descriptions on
+    most meetings, so each distinct title, start and identifier is only cleaned and
+    slugified into an ID once, and each distinct combination of title, description
+    and text is only scanned for cancellation words once for past meetings and once
+    for upcoming ones. Results are kept in per-spider LRU caches of memo_cache_size
+    entries, and hits and misses are recorded in crawler stats when the spider
+    closes.
+
+    Add it before CityScrapersSpider in a spider's bases.
+    """
+
+    memo_cache_size = 4096
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._memo_id = lru_cache(maxsize=self.memo_cache_size)(self._uncached_id)
+        self._memo_status = lru_cache(maxsize=self.memo_cache_size)(
+            self._uncached_status
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        crawler.signals.connect(spider._record_memo_stats, signal=signals.spider_closed)
+        return spider
+
+    def _get_id(self, item, identifier=None):
+        return self._memo_id(item["title"], item["start"], identifier)
+
+    def _get_status(self, item, text=""):
+        return self._memo_status(
+            item.get("title", ""),
+            item.get("description", ""),
+            text,
+            item["start"] < datetime.now(),
+        )
+
+    def _uncached_id(self, title, start, identifier):
+        return super()._get_id({"title": title, "start": start}, identifier=identifier)
+
+    def _uncached_status(self, title, description, text, passed):
+        # The status only depends on the start through whether it's passed
+        start = datetime.min if passed else datetime.max
+        return super()._get_status(
+            {"title": title, "description": description, "start": start}, text=text
+        )
+
+    def _record_memo_stats(self, spider):
+        for name, cache in [("id", self._memo_id), ("status", self._memo_status)]:
+            info = cache.cache_info()
+            lookups = info.hits + info.misses
+            self.crawler.stats.set_value(f"memo/{name}/hits", info.hits)
+            self.crawler.stats.set_value(f"memo/{name}/misses", info.misses)
+            self.crawler.stats.set_value(
+                f"memo/{name}/hit_rate",
+                round(info.hits / lookups, 3) if lookups else 0.0,
+            )
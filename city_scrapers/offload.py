@@ -0,0 +1,169 @@
+"""
+Parsing large responses in worker processes so the reactor can keep downloading.
+
+Callbacks decorated with cpu_bound run in a process pool when
+CITY_SCRAPERS_PARSE_WORKERS is set. The response is sent to a worker, which runs
+the callback on its own instance of the spider and returns the items and requests
+as plain values. They're rebuilt on the reactor thread once the worker finishes.
+
+The callback runs without a crawler or settings in the worker, and changes it
+makes to spider attributes aren't sent back, so it should only depend on the
+response, its keyword arguments and the picklable values in its request's meta.
+Responses that ContentHashMiddleware will replay stored output for aren't sent to a
+worker at all.
+"""
+
+import functools
+import multiprocessing
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from scrapy import Request
+from scrapy.http import Headers
+from scrapy.utils.request import request_from_dict
+from twisted.internet import defer
+
+from city_scrapers.middleware import ContentHashMiddleware
+
+_pool = None
+# Spider instances created in a worker process, reused so their caches persist
+_worker_spiders = {}
+
+
+def cpu_bound(callback):
+    """Mark a spider callback as CPU-bound so it's parsed in a worker process if
+    CITY_SCRAPERS_PARSE_WORKERS is set, and called as usual otherwise
+    """
+
+    @functools.wraps(callback)
+    def wrapper(spider, response, **kwargs):
+        settings = getattr(spider, "settings", None)
+        workers = settings.getint("CITY_SCRAPERS_PARSE_WORKERS") if settings else 0
+        if workers <= 0:
+            return callback(spider, response, **kwargs)
+        crawler = spider.crawler
+        content_hash = ContentHashMiddleware.for_crawler(crawler)
+        if content_hash is not None and content_hash.replayable(response):
+            # The middleware replaces the callback's output with the stored output
+            crawler.stats.inc_value("offload/skipped_unchanged", spider=spider)
+            return []
+        return _offload(spider, callback.__name__, response, kwargs, workers)
+
+    return wrapper
+
+
+def get_pool(workers):
+    """Return the process pool shared by all spiders, starting it if needed"""
+    global _pool
+    if _pool is None:
+        from twisted.internet import reactor
+
+        _pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        reactor.addSystemEventTrigger("before", "shutdown", shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def _offload(spider, name, response, kwargs, workers):
+    from twisted.internet import reactor
+
+    started = time.monotonic()
+    future = get_pool(workers).submit(
+        parse_in_worker,
+        type(spider),
+        name,
+        type(response),
+        response.url,
+        response.status,
+        dict(response.headers),
+        response.body,
+        getattr(response, "encoding", None),
+        kwargs,
+        _picklable_meta(response),
+    )
+    dfd = defer.Deferred()
+
+    def done(future):
+        reactor.callFromThread(_fire, dfd, future)
+
+    future.add_done_callback(done)
+    dfd.addCallback(_restore_outputs, spider, response, started)
+    return dfd
+
+
+def _picklable_meta(response):
+    """Return the values in a response's request meta that can be sent to a worker"""
+    if response.request is None:
+        return {}
+    meta = {}
+    for key, value in response.meta.items():
+        try:
+            pickle.dumps(value)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError):
+            continue
+        meta[key] = value
+    return meta
+
+
+def _fire(dfd, future):
+    error = future.exception()
+    if error is not None:
+        dfd.errback(error)
+    else:
+        dfd.callback(future.result())
+
+
+def _restore_outputs(outputs, spider, response, started):
+    crawler = getattr(spider, "crawler", None)
+    if crawler is not None:
+        crawler.stats.inc_value("offload/parsed", spider=spider)
+        crawler.stats.inc_value(
+            "offload/seconds", round(time.monotonic() - started, 3), spider=spider
+        )
+    results = []
+    for kind, cls, values in outputs:
+        if kind == "request":
+            results.append(request_from_dict(values, spider=spider))
+        else:
+            results.append(cls(values))
+    return results
+
+
+def parse_in_worker(
+    spider_cls, name, response_cls, url, status, headers, body, encoding, kwargs, meta
+):
+    """Run a spider callback on a response in a worker process, with a request
+    carrying the original request's meta and keyword arguments
+
+    :return: List of ("item", item class, fields) and ("request", None, request
+             dict) tuples for each output of the callback
+    """
+    spider = _worker_spiders.get(spider_cls)
+    if spider is None:
+        spider = _worker_spiders[spider_cls] = spider_cls()
+    response_kwargs = {"encoding": encoding} if encoding else {}
+    response = response_cls(
+        url=url,
+        status=status,
+        headers=Headers(headers),
+        body=body,
+        request=Request(url, meta=meta, cb_kwargs=kwargs),
+        **response_kwargs,
+    )
+    callback = getattr(type(spider), name).__wrapped__
+    outputs = []
+    for output in callback(spider, response, **kwargs) or []:
+        if isinstance(output, Request):
+            outputs.append(("request", None, output.to_dict(spider=spider)))
+        else:
+            outputs.append(("item", type(output), dict(output)))
+    return outputs
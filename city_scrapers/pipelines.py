@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+from datetime import date, datetime
+
+from city_scrapers_core.constants import CANCELLED
+from city_scrapers_core.items import Meeting
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider, DropItem, NotConfigured
+from scrapy.http import Response
+
+from city_scrapers.state import state_path
+
+DATETIME_FIELDS = ("start", "end")
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def meeting_hash(item):
+    """Return a hash of a meeting's content that doesn't depend on field order"""
+    content = json.dumps(dict(item), sort_keys=True, default=_json_default)
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+class LocalDiffPipeline:
+    """Only outputs meetings that are new or have changed since the previous run.
+
+    Each meeting's content hash is stored by ID in a SQLite database in the local
+    state directory, one per spider. Meetings with the same hash as the previous run
+    are dropped, and upcoming meetings that no longer appear in scraped results are
+    output once with a cancelled status. Hashes are only saved if the crawl
+    finishes, so meetings from a failed or cancelled crawl are output again.
+
+    Enabled with the CITY_SCRAPERS_LOCAL_DIFF setting.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.conn = None
+        self.previous = {}
+        self.scraped_ids = set()
+        self.cancelled_sent = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CITY_SCRAPERS_LOCAL_DIFF"):
+            raise NotConfigured
+        pipeline = cls(crawler)
+        crawler.signals.connect(pipeline.spider_idle, signal=signals.spider_idle)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        path = state_path(self.crawler.settings, f"diff-{spider.name}.sqlite3")
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meetings ("
+            "id TEXT PRIMARY KEY, hash TEXT NOT NULL, start TEXT, "
+            "status TEXT, item TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS meetings_start ON meetings (start)"
+        )
+        self.previous = dict(self.conn.execute("SELECT id, hash FROM meetings"))
+
+    def spider_closed(self, spider, reason):
+        """Save the hashes of meetings output by this run if the crawl finished"""
+        if reason == "finished":
+            self.conn.commit()
+        else:
+            self.conn.rollback()
+        self.conn.close()
+
+    def process_item(self, item, spider):
+        meeting_id = item["id"]
+        if meeting_id in self.scraped_ids:
+            raise DropItem("Item has already been scraped")
+        self.scraped_ids.add(meeting_id)
+        item_hash = meeting_hash(item)
+        previous_hash = self.previous.get(meeting_id)
+        if previous_hash == item_hash:
+            self.stats.inc_value("diff/unchanged", spider=spider)
+            raise DropItem("Item is unchanged since the previous run")
+        self.conn.execute(
+            "REPLACE INTO meetings (id, hash, start, status, item) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                meeting_id,
+                item_hash,
+                _json_default(item["start"]) if item.get("start") else None,
+                item.get("status"),
+                json.dumps(dict(item), default=_json_default),
+            ),
+        )
+        self.stats.inc_value(
+            "diff/new" if previous_hash is None else "diff/changed", spider=spider
+        )
+        return item
+
+    def spider_idle(self, spider):
+        """Output cancellations for upcoming meetings missing from this run once
+        scraped results have been processed
+
+        :param spider: Spider being scraped
+        :raises DontCloseSpider: Keeps the spider open while cancellations are
+                                 processed
+        """
+        if self.cancelled_sent:
+            return
+        self.cancelled_sent = True
+        scraper = self.crawler.engine.scraper
+        for item in self.missing_meetings():
+            self.stats.inc_value("diff/cancelled", spider=spider)
+            scraper._process_spidermw_output(item, None, Response(""), spider)
+        raise DontCloseSpider
+
+    def missing_meetings(self):
+        """Return upcoming meetings from previous runs that weren't scraped, marked
+        as cancelled
+        """
+        rows = self.conn.execute(
+            "SELECT id, item FROM meetings WHERE start > ? AND status != ?",
+            (datetime.now().isoformat(), CANCELLED),
+        )
+        meetings = []
+        for meeting_id, item_json in rows:
+            if meeting_id in self.scraped_ids:
+                continue
+            values = json.loads(item_json)
+            for field in DATETIME_FIELDS:
+                if values.get(field):
+                    values[field] = datetime.fromisoformat(values[field])
+            meetings.append(Meeting(**{**values, "status": CANCELLED}))
+        return meetings
@@ -0,0 +1,76 @@
+"""
+Named selectors compiled to lxml XPath objects once, when a spider module is
+imported, instead of translating and compiling CSS on every call.
+"""
+
+from time import perf_counter
+
+from lxml import etree
+from parsel.csstranslator import css2xpath
+
+
+class SelectorRegistry:
+    """Collection of compiled selectors that can be evaluated by name.
+
+    Evaluation counts and total time are kept for each selector so they can be
+    reported in crawler stats. Registries are usually shared by every instance of a
+    spider class, so counters should be reset when each crawl starts.
+    """
+
+    def __init__(self, css=None, xpath=None):
+        """Compile selectors
+
+        :param css: Dictionary of selector names to CSS queries, which can use
+                    parsel's ::text and ::attr() pseudo-elements
+        :param xpath: Dictionary of selector names to XPath expressions
+        """
+        expressions = {name: css2xpath(query) for name, query in (css or {}).items()}
+        expressions.update(xpath or {})
+        self.compiled = {
+            name: etree.XPath(expression) for name, expression in expressions.items()
+        }
+        self.reset()
+
+    def reset(self):
+        """Clear evaluation counts and times"""
+        self.counts = dict.fromkeys(self.compiled, 0)
+        self.seconds = dict.fromkeys(self.compiled, 0.0)
+
+    def xpath(self, name, node):
+        """Evaluate a selector, returning a list of elements or strings
+
+        :param name: Selector name
+        :param node: Response, parsel Selector or lxml element to evaluate against
+        :return: List of lxml elements, or strings for text and attribute selectors
+        """
+        start = perf_counter()
+        results = self.compiled[name](_root(node))
+        self.seconds[name] += perf_counter() - start
+        self.counts[name] += 1
+        # Convert "smart" strings to plain strings so they don't keep a reference to
+        # the document tree
+        return [
+            str(result) if isinstance(result, str) else result for result in results
+        ]
+
+    def get(self, name, node, default=None):
+        """Evaluate a selector and return the first result, or default if none match"""
+        results = self.xpath(name, node)
+        return results[0] if results else default
+
+    def record_stats(self, stats, spider=None):
+        """Add evaluation counts and times for each selector used to crawler stats"""
+        for name, count in self.counts.items():
+            if count:
+                stats.set_value(f"selectors/{name}/count", count, spider=spider)
+                stats.set_value(
+                    f"selectors/{name}/time_ms",
+                    round(self.seconds[name] * 1000, 3),
+                    spider=spider,
+                )
+
+
+def _root(node):
+    """Get the lxml element to evaluate against from a response or Selector"""
+    node = getattr(node, "selector", node)
+    return getattr(node, "root", node)
@@ -1,3 +1,5 @@
+import os
+
 from .base import *  # noqa
 
 USER_AGENT = (
@@ -11,8 +13,31 @@ ITEM_PIPELINES = {
 
 EXTENSIONS = {
     "scrapy.extensions.closespider.CloseSpider": None,
+    "city_scrapers.extensions.SelectorStatsExtension": 500,
 }
 
 SPIDER_MIDDLEWARES = {
     "city_scrapers.middleware.CityScrapersWaybackMiddleware": 500,
+    "city_scrapers.middleware.ContentHashMiddleware": 950,
 }
+
+# Maximum number of URLs submitted to the Wayback Machine per spider run, 0 for no
+# limit. URLs archived within CITY_SCRAPERS_WAYBACK_REARCHIVE_DAYS days are skipped
+CITY_SCRAPERS_WAYBACK_BUDGET = int(os.getenv("CITY_SCRAPERS_WAYBACK_BUDGET", 500))
+CITY_SCRAPERS_WAYBACK_REARCHIVE_DAYS = int(
+    os.getenv("CITY_SCRAPERS_WAYBACK_REARCHIVE_DAYS", 30)
+)
+
+# Submit URLs from a pool of background threads instead of through crawl requests,
+# retrying failures with exponential backoff. URLs still queued after waiting
+# CITY_SCRAPERS_WAYBACK_DRAIN_TIMEOUT seconds at the end of a run are saved and
+# submitted on the next run
+CITY_SCRAPERS_WAYBACK_QUEUE = (
+    os.getenv("CITY_SCRAPERS_WAYBACK_QUEUE", "true").lower() == "true"
+)
+CITY_SCRAPERS_WAYBACK_WORKERS = int(os.getenv("CITY_SCRAPERS_WAYBACK_WORKERS", 4))
+CITY_SCRAPERS_WAYBACK_RETRIES = 3
+CITY_SCRAPERS_WAYBACK_BACKOFF = 2.0
+CITY_SCRAPERS_WAYBACK_DRAIN_TIMEOUT = int(
+    os.getenv("CITY_SCRAPERS_WAYBACK_DRAIN_TIMEOUT", 300)
+)
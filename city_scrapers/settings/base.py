@@ -23,8 +23,14 @@ ROBOTSTXT_OBEY = True
 # Disable cookies (enabled by default)
 COOKIES_ENABLED = False
 
+# Throttle each domain separately based on its latency and errors in previous runs
+# instead of AutoThrottle's single target concurrency
+CITY_SCRAPERS_ADAPTIVE_THROTTLE = (
+    os.getenv("CITY_SCRAPERS_ADAPTIVE_THROTTLE", "").lower() == "true"
+)
+
 # Throttle results by default
-AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_ENABLED = not CITY_SCRAPERS_ADAPTIVE_THROTTLE
 AUTOTHROTTLE_START_DELAY = float(os.getenv("AUTOTHROTTLE_START_DELAY", 1.0))
 AUTOTHROTTLE_MAX_DELAY = float(os.getenv("AUTOTHROTTLE_MAX_DELAY", 30.0))
 AUTOTHROTTLE_TARGET_CONCURRENCY = float(
@@ -40,16 +46,128 @@ ITEM_PIPELINES = {
 # See http://scrapy.readthedocs.org/en/latest/topics/downloader-middleware.html
 DOWNLOADER_MIDDLEWARES = {
     "scrapy.downloadermiddlewares.robotstxt.RobotsTxtMiddleware": 543,
+    "scrapy.downloadermiddlewares.httpcache.HttpCacheMiddleware": None,
+    "city_scrapers.middleware.ConditionalHttpCacheMiddleware": 900,
+    "city_scrapers.middleware.AdaptiveThrottleMiddleware": 950,
+}
+
+# Download over a tuned pool of keep-alive connections with
+# CITY_SCRAPERS_POOLED_HTTP=true, recording connection reuse and TLS handshakes in
+# stats. Pool sizes can be set per host in CITY_SCRAPERS_POOL_HOST_SIZES and
+# CITY_SCRAPERS_HTTP2_HOSTS lists hosts to use HTTP/2 for if it's installed
+CITY_SCRAPERS_POOLED_HTTP = os.getenv("CITY_SCRAPERS_POOLED_HTTP", "").lower() == "true"
+if CITY_SCRAPERS_POOLED_HTTP:
+    DOWNLOAD_HANDLERS = {
+        "http": "city_scrapers.handlers.PooledHTTPDownloadHandler",
+        "https": "city_scrapers.handlers.PooledHTTPDownloadHandler",
+    }
+CITY_SCRAPERS_POOL_SIZE = int(os.getenv("CITY_SCRAPERS_POOL_SIZE", 0))
+CITY_SCRAPERS_POOL_HOST_SIZES = {}
+CITY_SCRAPERS_KEEPALIVE_TIMEOUT = int(os.getenv("CITY_SCRAPERS_KEEPALIVE_TIMEOUT", 240))
+CITY_SCRAPERS_HTTP2_HOSTS = []
+
+# Keep responses with ETag or Last-Modified headers between runs and revalidate them
+# with conditional requests, reusing the stored body when the server returns a 304.
+# Spiders with replay_unchanged set also reuse the previous run's output for a 304
+# instead of parsing the body again
+HTTPCACHE_ENABLED = os.getenv("HTTPCACHE_ENABLED", "").lower() == "true"
+HTTPCACHE_DIR = os.getenv("HTTPCACHE_DIR", "httpcache")
+HTTPCACHE_POLICY = "city_scrapers.middleware.ConditionalCachePolicy"
+HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
+HTTPCACHE_GZIP = True
+
+# Record every response to a local archive with CITY_SCRAPERS_REPLAY=record, and crawl
+# from the archive without network access or throttling with
+# CITY_SCRAPERS_REPLAY=replay. Archives are kept in CITY_SCRAPERS_REPLAY_DIR if set.
+# Both modes start from empty state in a temporary directory instead of
+# CITY_SCRAPERS_STATE_DIR, so caches and incremental state don't skip requests while
+# recording or change between replays. The HTTP cache is disabled in both modes so
+# the empty bodies of 304 responses are never recorded
+CITY_SCRAPERS_REPLAY = os.getenv("CITY_SCRAPERS_REPLAY", "").lower()
+CITY_SCRAPERS_REPLAY_DIR = os.getenv("CITY_SCRAPERS_REPLAY_DIR")
+if CITY_SCRAPERS_REPLAY not in ("", "record", "replay"):
+    raise ValueError(
+        f"CITY_SCRAPERS_REPLAY must be record or replay, not {CITY_SCRAPERS_REPLAY!r}"
+    )
+if CITY_SCRAPERS_REPLAY:
+    DOWNLOAD_HANDLERS = {
+        "http": "city_scrapers.handlers.RecordReplayDownloadHandler",
+        "https": "city_scrapers.handlers.RecordReplayDownloadHandler",
+    }
+    HTTPCACHE_ENABLED = False
+if CITY_SCRAPERS_REPLAY == "replay":
+    AUTOTHROTTLE_ENABLED = False
+    CITY_SCRAPERS_ADAPTIVE_THROTTLE = False
+    DOWNLOAD_DELAY = 0
+    CONCURRENT_REQUESTS_PER_DOMAIN = 32
+
+SPIDER_MIDDLEWARES = {
+    "city_scrapers.middleware.ContentHashMiddleware": 950,
 }
 
-SPIDER_MIDDLEWARES = {}
+# Reuse the previous run's output for unchanged responses in spiders that support it,
+# unless CITY_SCRAPERS_FORCE_PARSE is set
+CITY_SCRAPERS_CONTENT_HASH = (
+    os.getenv("CITY_SCRAPERS_CONTENT_HASH", "").lower() == "true"
+)
+CITY_SCRAPERS_FORCE_PARSE = os.getenv("CITY_SCRAPERS_FORCE_PARSE", "").lower() == "true"
+
+# Directory for local state kept between runs, defaults to .scrapy/state
+CITY_SCRAPERS_STATE_DIR = os.getenv("CITY_SCRAPERS_STATE_DIR")
 
-# Use commands from city_scrapers_core package
+# Only output new or changed archived meetings for spiders that support it, with a
+# full sweep of the archive every CITY_SCRAPERS_FULL_SWEEP_DAYS days
+CITY_SCRAPERS_INCREMENTAL = os.getenv("CITY_SCRAPERS_INCREMENTAL", "").lower() == "true"
+CITY_SCRAPERS_FULL_SWEEP_DAYS = int(os.getenv("CITY_SCRAPERS_FULL_SWEEP_DAYS", 7))
+
+# Drop meetings that haven't changed since the previous run when LocalDiffPipeline
+# is enabled, and output upcoming meetings that disappeared as cancelled
+CITY_SCRAPERS_LOCAL_DIFF = os.getenv("CITY_SCRAPERS_LOCAL_DIFF", "").lower() == "true"
+
+# Reuse Fort Worth Boards meeting details fetched within this many hours. Off by
+# default, so details are fetched again on every run
+CITY_SCRAPERS_CONTENTINFO_TTL_HOURS = float(
+    os.getenv("CITY_SCRAPERS_CONTENTINFO_TTL_HOURS", 0)
+)
 
-COMMANDS_MODULE = "city_scrapers_core.commands"
+# Request the Fort Worth Boards calendar in windows of this many days, 0 to request it
+# all at once. Windows from CITY_SCRAPERS_CALENDAR_PAST_DAYS ago to
+# CITY_SCRAPERS_CALENDAR_FUTURE_DAYS ahead are crawled, and windows that ended more
+# than CITY_SCRAPERS_CALENDAR_REFRESH_DAYS ago are only fetched once
+CITY_SCRAPERS_CALENDAR_WINDOW_DAYS = int(
+    os.getenv("CITY_SCRAPERS_CALENDAR_WINDOW_DAYS", 0)
+)
+CITY_SCRAPERS_CALENDAR_PAST_DAYS = int(
+    os.getenv("CITY_SCRAPERS_CALENDAR_PAST_DAYS", 365)
+)
+CITY_SCRAPERS_CALENDAR_FUTURE_DAYS = int(
+    os.getenv("CITY_SCRAPERS_CALENDAR_FUTURE_DAYS", 365)
+)
+CITY_SCRAPERS_CALENDAR_REFRESH_DAYS = int(
+    os.getenv("CITY_SCRAPERS_CALENDAR_REFRESH_DAYS", 31)
+)
+
+# Read large calendar pages incrementally for spiders that support it
+CITY_SCRAPERS_STREAMING_PARSE = (
+    os.getenv("CITY_SCRAPERS_STREAMING_PARSE", "").lower() == "true"
+)
+
+# Run callbacks marked as CPU-bound in this many worker processes instead of the
+# reactor thread, 0 runs them in the crawl process
+CITY_SCRAPERS_PARSE_WORKERS = int(os.getenv("CITY_SCRAPERS_PARSE_WORKERS", 0))
+
+# Use project commands, which include the commands from city_scrapers_core package
+
+COMMANDS_MODULE = "city_scrapers.commands"
+
+# Maximum number of spiders "scrapy crawlall" runs at once, 0 runs all of them
+CITY_SCRAPERS_CRAWLALL_CONCURRENCY = int(
+    os.getenv("CITY_SCRAPERS_CRAWLALL_CONCURRENCY", 0)
+)
 
 EXTENSIONS = {
     "scrapy.extensions.closespider.CloseSpider": None,
+    "city_scrapers.extensions.SelectorStatsExtension": 500,
 }
 
 CLOSESPIDER_ERRORCOUNT = 5
@@ -8,12 +8,16 @@ USER_AGENT = "City Scrapers [production mode]. Learn more and say hello at https
 # will deduplicate output UIDs based on City Scrapers IDs and list any meetings in the
 # future which no longer appear in scraped results as cancelled.
 
+# LocalDiffPipeline keeps the previous results in the local state directory instead,
+# and only outputs new or changed meetings when CITY_SCRAPERS_LOCAL_DIFF is set.
+
 # Configure item pipelines
 ITEM_PIPELINES = {
     # "city_scrapers_core.pipelines.S3DiffPipeline": 200,
     # "city_scrapers_core.pipelines.AzureDiffPipeline": 200,
     # "city_scrapers_core.pipelines.GCSDiffPipeline": 200,
     "city_scrapers_core.pipelines.MeetingPipeline": 300,
+    "city_scrapers.pipelines.LocalDiffPipeline": 350,
     "city_scrapers_core.pipelines.OpenCivicDataPipeline": 400,
 }
 
@@ -27,17 +31,31 @@ ITEM_PIPELINES = {
 
 SENTRY_DSN = os.getenv("SENTRY_DSN")
 
+# Set CITY_SCRAPERS_PROFILE to sample where each spider spends its time. Estimated
+# time per callback and pipeline is added to stats, and collapsed stacks for flame
+# graphs are written to CITY_SCRAPERS_PROFILE_DIR.
+CITY_SCRAPERS_PROFILE = os.getenv("CITY_SCRAPERS_PROFILE", "").lower() == "true"
+CITY_SCRAPERS_PROFILE_INTERVAL = float(
+    os.getenv("CITY_SCRAPERS_PROFILE_INTERVAL", 0.005)
+)
+CITY_SCRAPERS_PROFILE_DIR = os.getenv("CITY_SCRAPERS_PROFILE_DIR", "profiles")
+
 EXTENSIONS = {
     # "city_scrapers_core.extensions.AzureBlobStatusExtension": 100,
     # "city_scrapers_core.extensions.S3StatusExtension": 100,
     # "city_scrapers_core.extensions.GCSStatusExtension": 100,
     "scrapy_sentry_errors.extensions.Errors": 10,
     "scrapy.extensions.closespider.CloseSpider": None,
+    "city_scrapers.extensions.SelectorStatsExtension": 500,
+    "city_scrapers.extensions.HotPathProfilerExtension": 500,
 }
 
+# Set FEED_FORMAT to "jsonl.gz" to write compressed JSON lines in chunks, with an
+# index of the chunks in each feed written next to local feed files
 FEED_EXPORTERS = {
     "json": "scrapy.exporters.JsonItemExporter",
     "jsonlines": "scrapy.exporters.JsonLinesItemExporter",
+    "jsonl.gz": "city_scrapers.exporters.CompressedJsonLinesItemExporter",
 }
 
 FEED_FORMAT = "jsonlines"
@@ -1,11 +1,16 @@
-import requests
+from datetime import date, datetime, timedelta
+
+import scrapy
 from city_scrapers_core.constants import COMMISSION
-from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
-from dateutil.parser import parse
+
+from city_scrapers.dates import parse_datetime
+from city_scrapers.items import MeetingRecord
+from city_scrapers.mixins import MemoizedMeetingMixin
+from city_scrapers.state import JsonStateStore
 
 
-class FortxFortWorthBoardsSpider(CityScrapersSpider):
+class FortxFortWorthBoardsSpider(MemoizedMeetingMixin, CityScrapersSpider):
     name = "fortx_Fort_Worth_Boards"
     agency = "Fort Worth Boards and Commissions"
     timezone = "America/Chicago"
@@ -18,38 +23,309 @@ class FortxFortWorthBoardsSpider(CityScrapersSpider):
     start_urls = [
         "https://www.fortworthtexas.gov/ocapi/calendars/getcalendaritems?Ids=788ffb59-05d1-457d-b9dd-423d4b95a06e&LanguageCode=en-US"  # noqa
     ]
+    # Query parameters limiting calendar items to a date range. They aren't
+    # documented, so if a window's response includes items outside of it the whole
+    # calendar is parsed from that response and the other windows are skipped
+    window_params = ("StartDate", "EndDate")
+    _info_cache = None
+    _seen_ids = None
+    _window_cache = None
+    _windows_ignored = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Contentinfo responses fetched and requests in flight this run, by URL
+        self._info_fetched = {}
+        self._info_pending = {}
+
+    def start_requests(self):
+        """
+        Request the whole calendar, or one request per date window if
+        CITY_SCRAPERS_CALENDAR_WINDOW_DAYS is set.
+        Windows cover CITY_SCRAPERS_CALENDAR_PAST_DAYS before today to
+        CITY_SCRAPERS_CALENDAR_FUTURE_DAYS after it, and are aligned to fixed dates so
+        they're the same between runs. Windows ending more than
+        CITY_SCRAPERS_CALENDAR_REFRESH_DAYS ago are only fetched once and then read
+        from local state, through a data: URL request so they don't depend on any
+        other request succeeding. Windows aren't requested once a response shows the
+        API ignored the date range.
+        """
+        settings = getattr(self, "settings", None)
+        window_days = (
+            settings.getint("CITY_SCRAPERS_CALENDAR_WINDOW_DAYS") if settings else 0
+        )
+        if window_days <= 0:
+            yield from super().start_requests()
+            return
+
+        self._load_info_cache()
+        self._load_window_cache()
+        self._seen_ids = set()
+        windows = []
+        cached = []
+        for start, end in self._calendar_windows(window_days):
+            key = f"{start.isoformat()}/{end.isoformat()}"
+            if key in self._window_cache:
+                cached.append(key)
+            else:
+                windows.append((key, start, end))
+        # Drop cached windows that are now outside of the crawled range
+        self._window_cache = {key: self._window_cache[key] for key in cached}
+        self._inc_stat("calendar/windows_cached", len(cached))
+
+        if cached:
+            yield scrapy.Request(
+                "data:,",
+                callback=self._parse_cached_windows,
+                cb_kwargs={"windows": cached},
+                dont_filter=True,
+            )
+        for key, start, end in windows:
+            if self._windows_ignored:
+                self._inc_stat("calendar/windows_skipped")
+                continue
+            yield scrapy.Request(
+                self._calendar_url(start, end),
+                callback=self._parse_window,
+                cb_kwargs={"window": key, "historical": self._is_historical(end)},
+            )
 
     def parse(self, response):
         """
-        Parse meetings from multiple API responses.
+        Parse calendar items from the API response.
+        Each item needs another API request to get more info about the meeting.
+        Recurring meetings share the same content ID, so meetings are grouped by
+        info URL and each URL is only requested once per run, unless it was fetched
+        within CITY_SCRAPERS_CONTENTINFO_TTL_HOURS hours in a previous run. Meetings
+        for a URL that's already being fetched are completed by that response.
         """
+        self._load_info_cache()
+        yield from self._parse_calendar(response.json()["data"], response)
 
-        data = response.json()
+    def _parse_window(self, response, window, historical):
+        """
+        Parse one date window of the calendar, or the whole calendar if the response
+        has items outside of the window.
+        """
+        if self._windows_ignored:
+            self._inc_stat("calendar/windows_skipped")
+            return
+        data = response.json()["data"]
+        calendar_days = self._window_days(data, window)
+        self._inc_stat("calendar/windows_fetched")
+        if sum(len(day["Items"]) for day in calendar_days) < sum(
+            len(day["Items"]) for day in data
+        ):
+            # The response is the whole calendar, so there's no need for other windows
+            self._windows_ignored = True
+            self._inc_stat("calendar/windows_ignored")
+            self.logger.warning(
+                f"Calendar API ignored {'/'.join(self.window_params)}, parsing the "
+                f"whole calendar from {response.url}"
+            )
+            yield from self._parse_calendar(data, response)
+            return
+        if historical and self._window_cache is not None:
+            self._window_cache[window] = calendar_days
+        yield from self._parse_calendar(calendar_days, response)
 
-        for calendar_day in data["data"]:
-            for item in calendar_day["Items"]:
-                # make another API requests to get more info about meeting
-                info_url = f"https://www.fortworthtexas.gov/ocapi/get/contentinfo?calendarId={item['CalendarId']}&contentId={item['Id']}&language=en-US&mainContentId={item['Id']}"  # noqa
-                headers = {"User-Agent": ""}
-                info = requests.get(info_url, headers=headers).json()["data"]
+    def _parse_cached_windows(self, response, windows):
+        """
+        Parse historical windows saved in previous runs.
+        """
+        for window in windows:
+            yield from self._parse_calendar(
+                self._window_days(self._window_cache[window], window), response
+            )
 
-                meeting = Meeting(
+    def _window_days(self, calendar_days, window):
+        """
+        Return calendar days with only the items that start within a window's dates.
+        """
+        start, end = (date.fromisoformat(value) for value in window.split("/"))
+        window_days = []
+        for calendar_day in calendar_days:
+            items = [
+                item
+                for item in calendar_day["Items"]
+                if start
+                <= parse_datetime(item["DateTime"], dayfirst=True).date()
+                <= end
+            ]
+            if items:
+                window_days.append({**calendar_day, "Items": items})
+        return window_days
+
+    def _parse_calendar(self, calendar_days, response):
+        meetings_by_url = {}
+        for calendar_day in calendar_days:
+            for item in calendar_day["Items"]:
+                meeting = MeetingRecord(
                     title=item["Name"],
-                    description=info["Description"],
                     classification=COMMISSION,
-                    start=parse(item["DateTime"], dayfirst=True),
+                    start=parse_datetime(item["DateTime"], dayfirst=True),
                     end=None,
                     all_day=False,
                     time_notes="",
-                    location=self._parse_location(info),
-                    links=self._parse_links(info),
                     source=self._parse_source(response),
                 )
+                if self._seen_ids is not None:
+                    # Meetings can be repeated in more than one window's response
+                    meeting_id = self._get_id(meeting)
+                    if meeting_id in self._seen_ids:
+                        self._inc_stat("calendar/duplicates")
+                        continue
+                    self._seen_ids.add(meeting_id)
+                info_url = self._parse_info_url(item)
+                meetings_by_url.setdefault(info_url, []).append(meeting)
+
+        for info_url, meetings in meetings_by_url.items():
+            info = self._get_cached_info(info_url)
+            if info is not None:
+                self._inc_stat("contentinfo/cache_hits")
+                yield from self._parse_meetings(info, meetings)
+            elif info_url in self._info_pending:
+                # Another calendar response already requested this URL
+                self._info_pending[info_url].extend(meetings)
+                self._inc_stat("contentinfo/coalesced", len(meetings))
+            else:
+                self._info_pending[info_url] = meetings
+                self._inc_stat("contentinfo/coalesced", len(meetings) - 1)
+                # Duplicates are already avoided, and a URL is only requested again
+                # if its last request failed
+                yield scrapy.Request(
+                    info_url,
+                    # The contentinfo API has always been requested without a user agent
+                    headers={"User-Agent": ""},
+                    callback=self._parse_info,
+                    errback=self._info_failed,
+                    cb_kwargs={"meetings": meetings},
+                    dont_filter=True,
+                )
 
-                meeting["status"] = self._get_status(meeting)
-                meeting["id"] = self._get_id(meeting)
+    def _parse_info(self, response, meetings):
+        """
+        Complete the partially built meetings sharing a contentinfo API response,
+        including any added while the request was in flight.
+        """
+        info = response.json()["data"]
+        # Pending meetings and cached responses are keyed by the requested URL, which
+        # the response URL won't match if the request was redirected
+        info_url = response.request.url
+        meetings = self._info_pending.pop(info_url, meetings)
+        self._info_fetched[info_url] = info
+        if self._info_cache is not None:
+            self._info_cache[info_url] = {
+                "fetched": datetime.now().isoformat(),
+                "data": info,
+            }
+        yield from self._parse_meetings(info, meetings)
+
+    def _info_failed(self, failure):
+        """Log a failed contentinfo request so later calendar responses request the
+        URL again instead of waiting on it
+        """
+        meetings = self._info_pending.pop(failure.request.url, [])
+        self._inc_stat("contentinfo/failed")
+        self.logger.error(
+            f"Dropped {len(meetings)} meetings after contentinfo request failed: "
+            f"{failure.request.url} ({failure.value!r})"
+        )
+
+    def _parse_meetings(self, info, meetings):
+        for meeting in meetings:
+            meeting["description"] = info["Description"]
+            meeting["location"] = self._parse_location(info)
+            meeting["links"] = self._parse_links(info)
+
+            meeting["status"] = self._get_status(meeting)
+            meeting["id"] = self._get_id(meeting)
+
+            yield meeting.to_meeting()
+
+    def _load_info_cache(self):
+        """Load contentinfo responses fetched in previous runs if caching is enabled"""
+        self._info_cache = None
+        settings = getattr(self, "settings", None)
+        ttl_hours = (
+            settings.getfloat("CITY_SCRAPERS_CONTENTINFO_TTL_HOURS") if settings else 0
+        )
+        if ttl_hours <= 0:
+            return
+        self._info_store = JsonStateStore.from_settings(settings, f"{self.name}.json")
+        cutoff = (datetime.now() - timedelta(hours=ttl_hours)).isoformat()
+        self._info_cache = {
+            url: entry
+            for url, entry in self._info_store.load({}).items()
+            if entry["fetched"] > cutoff
+        }
+
+    def _get_cached_info(self, info_url):
+        if info_url in self._info_fetched:
+            return self._info_fetched[info_url]
+        if self._info_cache is None or info_url not in self._info_cache:
+            return None
+        return self._info_cache[info_url]["data"]
+
+    def _load_window_cache(self):
+        """Load historical calendar windows fetched in previous runs"""
+        self._window_store = JsonStateStore.from_settings(
+            self.settings, f"{self.name}-windows.json"
+        )
+        self._window_cache = self._window_store.load({})
+
+    def _calendar_windows(self, window_days):
+        """
+        Return the first and last date of each window in the crawled range.
+        Windows are aligned to multiples of window_days since the first ordinal date.
+        """
+        today = date.today()
+        first = today.toordinal() - self.settings.getint(
+            "CITY_SCRAPERS_CALENDAR_PAST_DAYS"
+        )
+        last = today.toordinal() + self.settings.getint(
+            "CITY_SCRAPERS_CALENDAR_FUTURE_DAYS"
+        )
+        start = first - (first - 1) % window_days
+        windows = []
+        while start <= last:
+            windows.append(
+                (date.fromordinal(start), date.fromordinal(start + window_days - 1))
+            )
+            start += window_days
+        return windows
+
+    def _is_historical(self, end):
+        """Check whether a window ended before the rolling window that's re-fetched"""
+        refresh_days = self.settings.getint("CITY_SCRAPERS_CALENDAR_REFRESH_DAYS")
+        return end < date.today() - timedelta(days=refresh_days)
+
+    def _calendar_url(self, start, end):
+        start_param, end_param = self.window_params
+        return (
+            f"{self.start_urls[0]}&{start_param}={start.isoformat()}"
+            f"&{end_param}={end.isoformat()}"
+        )
+
+    def _inc_stat(self, key, count=1):
+        crawler = getattr(self, "crawler", None)
+        if crawler is not None:
+            crawler.stats.inc_value(key, count)
+
+    def closed(self, reason):
+        """Save fetched contentinfo responses and historical calendar windows if the
+        crawl finished
+        """
+        if reason != "finished":
+            return
+        if self._info_cache is not None:
+            self._info_store.save(self._info_cache)
+        if self._window_cache is not None:
+            self._window_store.save(self._window_cache)
 
-                yield meeting
+    def _parse_info_url(self, item):
+        """Generate the contentinfo API URL for a calendar item."""
+        return f"https://www.fortworthtexas.gov/ocapi/get/contentinfo?calendarId={item['CalendarId']}&contentId={item['Id']}&language=en-US&mainContentId={item['Id']}"  # noqa
 
     def _parse_location(self, info):
         """
@@ -1,15 +1,31 @@
 from city_scrapers_core.constants import BOARD
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
-from dateutil.parser import parse
 
+from city_scrapers.dates import parse_datetime
+from city_scrapers.mixins import MemoizedMeetingMixin
+from city_scrapers.offload import cpu_bound
+from city_scrapers.selectors import SelectorRegistry
+from city_scrapers.streaming import has_class, iter_html_elements, streaming_enabled
 
-class FortxFortWorthIsdSpider(CityScrapersSpider):
+
+class FortxFortWorthIsdSpider(MemoizedMeetingMixin, CityScrapersSpider):
     name = "fortx_Fort_Worth_Isd"
     agency = "Fort Worth ISD Board"
     timezone = "America/Chicago"
     start_urls = ["https://www.fwisd.org/board/board-of-education/board-calendar"]
+    replay_unchanged = True
+    selectors = SelectorRegistry(
+        css={
+            "days": ".fsStateHasEvents",
+            "title": ".fsCalendarTitle::text",
+            "start": ".fsStartTime::attr(datetime)",
+            "end": ".fsEndTime::attr(datetime)",
+            "location": ".fsLocation::text",
+        }
+    )
 
+    @cpu_bound
     def parse(self, response):
         """
         The website shows a literal calendar on the page.
@@ -17,9 +33,9 @@ class FortxFortWorthIsdSpider(CityScrapersSpider):
         """
 
         # loop thru all dates that have events on them
-        for day in response.css(".fsStateHasEvents"):
+        for day in self._parse_days(response):
             meeting = Meeting(
-                title=day.css(".fsCalendarTitle::text").get(),
+                title=self.selectors.get("title", day),
                 description="",
                 classification=BOARD,
                 start=self._parse_start(day),
@@ -36,29 +52,43 @@ class FortxFortWorthIsdSpider(CityScrapersSpider):
 
             yield meeting
 
+    def _parse_days(self, response):
+        """
+        Select calendar days with events.
+        The calendar page is large, so with CITY_SCRAPERS_STREAMING_PARSE enabled
+        days are read incrementally instead of parsing the whole document first.
+        """
+        if streaming_enabled(self):
+            return iter_html_elements(
+                response,
+                lambda element: has_class(element, "fsStateHasEvents"),
+                tags="div",
+            )
+        return self.selectors.xpath("days", response)
+
     def _strip_timezone(self, string):
         """Helper method to strip timezone information."""
         if not string:
             return None
         # parse datetime string to datetime but ignore timezone
-        dt_naive = parse(string, ignoretz=True)
+        dt_naive = parse_datetime(string, ignoretz=True)
         return dt_naive
 
     def _parse_start(self, day):
         """Parse start datetime as a naive datetime object."""
-        with_tz = day.css(".fsStartTime::attr(datetime)").get()
+        with_tz = self.selectors.get("start", day)
         no_tz = self._strip_timezone(with_tz)
         return no_tz
 
     def _parse_end(self, day):
         """Parse end datetime as a naive datetime object."""
-        with_tz = day.css(".fsEndTime::attr(datetime)").get()
+        with_tz = self.selectors.get("end", day)
         no_tz = self._strip_timezone(with_tz)
         return no_tz
 
     def _parse_location(self, day):
         """Parse or generate location."""
-        name = day.css(".fsLocation::text").get()
+        name = self.selectors.get("location", day)
         if not name:
             name = "TBD"
         return {"name": name, "address": ""}
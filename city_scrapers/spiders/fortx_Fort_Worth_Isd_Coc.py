@@ -1,17 +1,43 @@
 from city_scrapers_core.constants import COMMITTEE
-from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
-from dateutil.parser import parse
 
+from city_scrapers.dates import parse_datetime
+from city_scrapers.items import MeetingRecord
+from city_scrapers.mixins import MemoizedMeetingMixin
+from city_scrapers.offload import cpu_bound
+from city_scrapers.selectors import SelectorRegistry
+from city_scrapers.streaming import has_class, iter_html_elements, streaming_enabled
 
-class FortxFortWorthIsdCocSpider(CityScrapersSpider):
+
+class FortxFortWorthIsdCocSpider(MemoizedMeetingMixin, CityScrapersSpider):
     name = "fortx_Fort_Worth_Isd_Coc"
     agency = "Fort Worth ISD Citizens' Oversight Committee"
     timezone = "America/Chicago"
     start_urls = [
         "https://www.fwisd.org/departments/operations/capital-improvement-program/2021-citizens-oversight-committee-coc"  # noqa
     ]
+    location = {
+        "name": "Fort Worth ISD District Service Center",
+        "address": "7060 Camp Bowie Blvd, Fort Worth, TX 76116",
+    }
+    replay_unchanged = True
+    selectors = SelectorRegistry(
+        css={
+            "tables": "table",
+            "rows": "tr",
+            "days": ".fsDayContainer",
+            "title": ".fsTitle a::text",
+            "start": ".fsStartTime::attr(datetime)",
+            "end": ".fsEndTime::attr(datetime)",
+            "past_date": "td::text",
+            "cells": "td",
+            "links": "a",
+            "link_title": "a::text",
+            "link_href": "a::attr(href)",
+        }
+    )
 
+    @cpu_bound
     def parse(self, response):
         """
         Parse 2021 Citizens' Oversight Committee page.
@@ -19,11 +45,9 @@ class FortxFortWorthIsdCocSpider(CityScrapersSpider):
         There is also a Meeting Documents section with a table of past meetings.
         Scrape both.
         """
-
-        location = {
-            "name": "Fort Worth ISD District Service Center",
-            "address": "7060 Camp Bowie Blvd, Fort Worth, TX 76116",
-        }
+        if streaming_enabled(self):
+            yield from self._parse_streaming(response)
+            return
 
         # keep track of scraped dates to prevent duplicates
         scraped_dates = set()
@@ -31,63 +55,113 @@ class FortxFortWorthIsdCocSpider(CityScrapersSpider):
         # the first table has the old events
         # if there are duplicates on the page, we are potentially missing data
         # scrape data from table first bc it has more data (links) than next section
-        for item in response.css("table")[0].css("tr"):
-            start = self._parse_past_start(item)
-            scraped_dates.add(start.date())
-            meeting = Meeting(
-                title="2021 Citizens' Oversight Committee Meeting",
-                description="",
-                classification=COMMITTEE,
-                start=start,
-                end=None,
-                all_day=False,
-                time_notes="",
-                location=location,
-                links=self._parse_past_links(item),
-                source=self._parse_source(response),
-            )
-
-            meeting["status"] = self._get_status(meeting)
-            meeting["id"] = self._get_id(meeting)
-
-            yield meeting
+        table = self.selectors.xpath("tables", response)[0]
+        for item in self.selectors.xpath("rows", table):
+            meeting = self._parse_past_meeting(item, response)
+            scraped_dates.add(meeting["start"].date())
+            yield meeting.to_meeting()
 
         # go over the new events
-        for item in response.css(".fsDayContainer"):
-            start = self._parse_upcoming_start(item)
-            if start and start.date() not in scraped_dates:
-                meeting = Meeting(
-                    title=self._parse_upcoming_title(item),
-                    description="",
-                    classification=COMMITTEE,
-                    start=start,
-                    end=self._parse_upcoming_end(item),
-                    all_day=False,
-                    time_notes="",
-                    location=location,
-                    links=[],
-                    source=self._parse_source(response),
-                )
-
-                meeting["status"] = self._get_status(meeting)
-                meeting["id"] = self._get_id(meeting)
-
-                yield meeting
+        for item in self.selectors.xpath("days", response):
+            meeting = self._parse_upcoming_meeting(item, response)
+            if meeting and meeting["start"].date() not in scraped_dates:
+                yield meeting.to_meeting()
+
+    def _parse_streaming(self, response):
+        """
+        Parse the page incrementally when CITY_SCRAPERS_STREAMING_PARSE is enabled.
+        Only the tables and calendar days are kept in memory while reading the page.
+        Upcoming meetings found before the past meetings table are held back until
+        the table has been read so duplicates can still be removed.
+        """
+        scraped_dates = set()
+        past_parsed = False
+        upcoming = []
+
+        def match(element):
+            return element.tag == "table" or has_class(element, "fsDayContainer")
+
+        for element in iter_html_elements(response, match, tags=["table", "div"]):
+            if element.root.tag == "table":
+                # only the first table has the old events
+                if past_parsed:
+                    continue
+                past_parsed = True
+                for item in self.selectors.xpath("rows", element):
+                    meeting = self._parse_past_meeting(item, response)
+                    scraped_dates.add(meeting["start"].date())
+                    yield meeting.to_meeting()
+                continue
+
+            meeting = self._parse_upcoming_meeting(element, response)
+            if not meeting:
+                continue
+            if not past_parsed:
+                upcoming.append(meeting)
+            elif meeting["start"].date() not in scraped_dates:
+                yield meeting.to_meeting()
+
+        for meeting in upcoming:
+            if meeting["start"].date() not in scraped_dates:
+                yield meeting.to_meeting()
+
+    def _parse_past_meeting(self, item, response):
+        """Parse a meeting from a row of the past meetings table."""
+        meeting = MeetingRecord(
+            title="2021 Citizens' Oversight Committee Meeting",
+            description="",
+            classification=COMMITTEE,
+            start=self._parse_past_start(item),
+            end=None,
+            all_day=False,
+            time_notes="",
+            location=self.location,
+            links=self._parse_past_links(item),
+            source=self._parse_source(response),
+        )
+
+        meeting["status"] = self._get_status(meeting)
+        meeting["id"] = self._get_id(meeting)
+
+        return meeting
+
+    def _parse_upcoming_meeting(self, item, response):
+        """Parse a meeting from the calendar, returns None if it has no start."""
+        start = self._parse_upcoming_start(item)
+        if not start:
+            return None
+        meeting = MeetingRecord(
+            title=self._parse_upcoming_title(item),
+            description="",
+            classification=COMMITTEE,
+            start=start,
+            end=self._parse_upcoming_end(item),
+            all_day=False,
+            time_notes="",
+            location=self.location,
+            links=[],
+            source=self._parse_source(response),
+        )
+
+        meeting["status"] = self._get_status(meeting)
+        meeting["id"] = self._get_id(meeting)
+
+        return meeting
 
     def _parse_upcoming_title(self, item):
         """Parse or generate meeting title."""
-        return item.css(".fsTitle a::text").get()
+        return self.selectors.get("title", item)
 
     def _strip_timezone(self, string):
         """Helper method to strip timezone information."""
         if not string:
             return None
-        dt_naive = parse(string, ignoretz=True)
+        dt_naive = parse_datetime(string, ignoretz=True)
         return dt_naive
 
     def _parse_upcoming_start(self, item):
         """Parse upcoming start datetime as a naive datetime object."""
-        datetime = item.css(".fsStartTime::attr(datetime)").get()
+        datetime = self.selectors.get("start", item)
         return self._strip_timezone(datetime)
 
     def _parse_past_start(self, item):
@@ -95,25 +169,25 @@ class FortxFortWorthIsdCocSpider(CityScrapersSpider):
         Parse past start date as a naive datetime object.
         All meeting appear to happen at 6PM. 6PM is the default.
         """
-        date = item.css("td::text").get()
-        return parse(f"{date} 6:00PM")
+        date = self.selectors.get("past_date", item)
+        return parse_datetime(f"{date} 6:00PM")
 
     def _parse_upcoming_end(self, item):
         """Parse end datetime as a naive datetime object. Added by pipeline if None"""
-        datetime = item.css(".fsEndTime::attr(datetime)").get()
+        datetime = self.selectors.get("end", item)
         return self._strip_timezone(datetime)
 
     def _parse_past_links(self, item):
         """Parse or generate links."""
         links = []
-        cells = item.css("td")
+        cells = self.selectors.xpath("cells", item)
         # loop thru each cell
         for cell in cells:
             # check if there is a link present
-            if cell.css("a"):
+            if self.selectors.xpath("links", cell):
                 # if so, add link to links array
-                title = cell.css("a::text").get()
-                href = cell.css("a::attr(href)").get()
+                title = self.selectors.get("link_title", cell)
+                href = self.selectors.get("link_href", cell)
                 links.append({"title": title, "href": href})
 
         return links
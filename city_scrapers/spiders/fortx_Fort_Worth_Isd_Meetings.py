@@ -1,32 +1,55 @@
+from collections import namedtuple
 from urllib.parse import urljoin
 
 from city_scrapers_core.constants import NOT_CLASSIFIED
 from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
-from dateutil.parser import parse
 
+from city_scrapers.dates import parse_datetime
+from city_scrapers.mixins import MemoizedMeetingMixin
+from city_scrapers.offload import cpu_bound
+from city_scrapers.selectors import SelectorRegistry
 
-class FortxFortWorthIsdMeetingsSpider(CityScrapersSpider):
+# Values read from a table row once and shared by the _parse_* helpers
+Row = namedtuple("Row", ["heading", "location_lines", "links"])
+
+
+class FortxFortWorthIsdMeetingsSpider(MemoizedMeetingMixin, CityScrapersSpider):
     name = "fortx_Fort_Worth_Isd_Meetings"
     agency = "Fort Worth ISD Meetings"
     timezone = "America/Chicago"
     start_urls = ["https://meetings.boardbook.org/public/organization/733"]
+    replay_unchanged = True
 
+    selectors = SelectorRegistry(
+        css={
+            "rows": "table tbody tr",
+            "links": "a",
+        },
+        xpath={
+            "heading": "(descendant-or-self::td)[1]/descendant::div/text()",
+            "location_lines": "(descendant-or-self::td)[2]/descendant::span/text()",
+            "link_text": "descendant-or-self::text()",
+        },
+    )
+
+    @cpu_bound
     def parse(self, response):
         """
         Parse meetings from table.
         """
-        for item in response.css("table tbody tr"):
+        for item in self.selectors.xpath("rows", response):
+            row = self._parse_row(item)
             meeting = Meeting(
-                title=self._parse_title(item),
+                title=self._parse_title(row),
                 description="",
                 classification=NOT_CLASSIFIED,
-                start=self._parse_start(item),
+                start=self._parse_start(row),
                 end=None,
                 all_day=False,
                 time_notes="",
-                location=self._parse_location(item),
-                links=self._parse_links(item),
+                location=self._parse_location(row),
+                links=self._parse_links(row),
                 source=self._parse_source(response),
             )
 
@@ -35,40 +58,44 @@ class FortxFortWorthIsdMeetingsSpider(CityScrapersSpider):
 
             yield meeting
 
-    def _parse_title(self, item):
+    def _parse_row(self, item):
+        """Extract the values used by the other helpers from a table row in one pass."""
+        links = [
+            (self.selectors.get("link_text", link), link.get("href"))
+            for link in self.selectors.xpath("links", item)
+        ]
+        return Row(
+            heading=self.selectors.get("heading", item),
+            location_lines=self.selectors.xpath("location_lines", item),
+            links=links,
+        )
+
+    def _parse_title(self, row):
         """Parse meeting title."""
-        str = item.css("td")[0].css("div::text").get()
-        title = str.split("-")[1].strip()
+        title = row.heading.split("-")[1].strip()
         return title
 
-    def _parse_start(self, item):
+    def _parse_start(self, row):
         """Parse start datetime as a naive datetime object."""
-        str = item.css("td")[0].css("div::text").get()
-        date, time = str.split("at")
+        date, time = row.heading.split("at")
         time = time.split("-")[0]
-        return parse(f"{date} {time}")
+        return parse_datetime(f"{date} {time}")
 
-    def _parse_location(self, item):
+    def _parse_location(self, row):
         """Parse location from 2nd field."""
-        lines = item.css("td")[1].css("span::text")
-        name = lines[0].get()
-        line1 = lines[1].get()
-        line2 = lines[2].get()
+        name, line1, line2 = row.location_lines[:3]
         return {
             "name": name,
             "address": f"{line1}, {line2}",
         }
 
-    def _parse_links(self, item):
+    def _parse_links(self, row):
         """Parse links from table row."""
         base_url = "https://meetings.boardbook.org/"
         output = []
-        links = item.css("a")
-        for link in links:
-            title = link.css("::text").get()
+        for title, href in row.links:
             if title == " map it":
                 title = "Map Link"
-            href = link.css("::attr(href)").get()
             # prepend base URL if necessary
             # enables usability on other websites
             href = urljoin(base_url, href)
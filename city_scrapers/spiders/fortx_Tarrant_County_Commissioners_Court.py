@@ -1,13 +1,19 @@
 import json
+from datetime import datetime, timedelta
 
 import scrapy
 from city_scrapers_core.constants import COMMISSION
-from city_scrapers_core.items import Meeting
 from city_scrapers_core.spiders import CityScrapersSpider
-from dateutil.parser import parse as dateparse
 
+from city_scrapers.dates import parse_datetime
+from city_scrapers.items import MeetingRecord
+from city_scrapers.mixins import MemoizedMeetingMixin
+from city_scrapers.state import JsonStateStore
 
-class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
+
+class FortxTarrantCountyCommissionersCourtSpider(
+    MemoizedMeetingMixin, CityScrapersSpider
+):
     name = "fortx_Tarrant_County_Commissioners_Court"
     agency = "Tarrant County Commissioners Court"
     timezone = "America/Chicago"
@@ -21,6 +27,12 @@ class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
 
     The data from the URLs are taken through a POST request with a payload
     containing the committee ID. The committee ID is the same for both URLs.
+
+    The archive only grows, so with CITY_SCRAPERS_INCREMENTAL enabled the scraper
+    keeps the latest archived start time and the attachment IDs of each meeting
+    still in the archive between runs, and only outputs archived meetings that are
+    new or whose agenda, minutes or video changed. A full sweep of the archive is
+    still output every CITY_SCRAPERS_FULL_SWEEP_DAYS days.
     """
     start_urls = [
         "https://tarrant-agendamanagement-public.techsharetx.gov/publicportal/api/meetings/readArchived",  # noqa
@@ -35,7 +47,11 @@ class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
         "name": "Tarrant County Administration Building (check the agenda for room location)",  # noqa
     }
 
+    archive_link_keys = ["agendaAttachmentId", "minutesAttachmentId", "videoId"]
+    _archive_state = None
+
     def start_requests(self):
+        self._load_archive_state()
         payload = {"committeeId": self.committee_id}
         for url in self.start_urls:
             yield scrapy.Request(
@@ -49,8 +65,10 @@ class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
     def parse(self, response):
         data = response.json()
         meetings = data.get("data", [])
+        if self._archive_state is not None and response.url == self.start_urls[0]:
+            meetings = self._filter_archived(meetings)
         for item in meetings:
-            meeting = Meeting(
+            meeting = MeetingRecord(
                 title=item.get("description", "Commissioners Court"),
                 description="",
                 classification=COMMISSION,
@@ -58,7 +76,7 @@ class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
                 end=self._parse_datetime(item.get("meetingEndDateTime")),
                 all_day=False,
                 time_notes="",
-                location=self.location,
+                location=dict(self.location),
                 links=self._parse_links(item),
                 source=self.source_url,
             )
@@ -66,14 +84,80 @@ class FortxTarrantCountyCommissionersCourtSpider(CityScrapersSpider):
             meeting["status"] = self._get_status(meeting)
             meeting["id"] = self._get_id(meeting)
 
-            yield meeting
+            yield meeting.to_meeting()
+
+    def _load_archive_state(self):
+        """Load archived meetings seen in previous runs if running incrementally"""
+        self._archive_state = None
+        settings = getattr(self, "settings", None)
+        if not settings or not settings.getbool("CITY_SCRAPERS_INCREMENTAL"):
+            return
+        self._archive_store = JsonStateStore.from_settings(
+            settings, f"{self.name}.json"
+        )
+        self._archive_state = self._archive_store.load(
+            {"high_water_mark": None, "last_full_sweep": None, "meetings": {}}
+        )
+
+    def _is_full_sweep(self):
+        """Check whether the archive is due for a full reconciliation sweep"""
+        last_full_sweep = self._archive_state["last_full_sweep"]
+        if not last_full_sweep:
+            return True
+        sweep_days = self.settings.getint("CITY_SCRAPERS_FULL_SWEEP_DAYS", 7)
+        return datetime.now() - parse_datetime(last_full_sweep) >= timedelta(
+            days=sweep_days
+        )
+
+    def _filter_archived(self, meetings):
+        """
+        Only return archived meetings that are newer than the high-water mark from
+        the previous run, haven't been seen before, or have changed links.
+        Returns every meeting when a full sweep is due. Meetings that have dropped
+        out of the archive are removed from the state.
+        """
+        state = self._archive_state
+        full_sweep = self._is_full_sweep()
+        high_water_mark = latest_start = state["high_water_mark"]
+        seen = state["meetings"]
+        archived = {}
+        output = []
+        for item in meetings:
+            start = item.get("meetingStartDateTime") or ""
+            links = [item.get(key) for key in self.archive_link_keys]
+            if (
+                full_sweep
+                or (high_water_mark and start > high_water_mark)
+                or seen.get(item.get("id")) != links
+            ):
+                output.append(item)
+            archived[item.get("id")] = links
+            if start and (not latest_start or start > latest_start):
+                latest_start = start
+        state["high_water_mark"] = latest_start
+        state["meetings"] = archived
+        if full_sweep:
+            state["last_full_sweep"] = datetime.now().isoformat()
+        self.crawler.stats.set_value("incremental/full_sweep", full_sweep)
+        self.crawler.stats.set_value(
+            "incremental/archived_skipped", len(meetings) - len(output)
+        )
+        self.crawler.stats.set_value(
+            "incremental/pruned", len(seen.keys() - archived.keys())
+        )
+        return output
+
+    def closed(self, reason):
+        """Save the archive state, only advancing it if the crawl finished"""
+        if self._archive_state is not None and reason == "finished":
+            self._archive_store.save(self._archive_state)
 
     def _parse_datetime(self, datetime_str):
         """
         Parse the datetime string into a datetime object.
         """
         if datetime_str:
-            return dateparse(datetime_str)
+            return parse_datetime(datetime_str)
         return None
 
     def _parse_links(self, item):
@@ -0,0 +1,88 @@
+import atexit
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+from scrapy.utils.project import data_path
+
+# Temporary state directory for crawls recording or replaying an archive
+_replay_state_dir = None
+
+
+def state_path(settings, filename):
+    """Return the path of a file in the local state directory shared between runs.
+
+    Uses CITY_SCRAPERS_STATE_DIR if set, otherwise the project's .scrapy/state
+    directory. Crawls recording or replaying an archive with CITY_SCRAPERS_REPLAY
+    use an empty temporary directory that's removed when the process exits
+    instead, so they crawl everything a first run would and never change the state
+    of normal crawls.
+
+    :param settings: Crawler settings
+    :param filename: Name of the state file
+    :return: Absolute path to the state file
+    """
+    if settings.get("CITY_SCRAPERS_REPLAY"):
+        state_dir = replay_state_dir()
+    else:
+        state_dir = settings.get("CITY_SCRAPERS_STATE_DIR") or data_path(
+            "state", createdir=True
+        )
+    os.makedirs(state_dir, exist_ok=True)
+    return os.path.join(state_dir, filename)
+
+
+def replay_state_dir():
+    """Return the temporary state directory used while recording or replaying,
+    creating it if needed
+    """
+    global _replay_state_dir
+    if _replay_state_dir is None:
+        _replay_state_dir = tempfile.mkdtemp(prefix="city-scrapers-replay-")
+        atexit.register(shutil.rmtree, _replay_state_dir, ignore_errors=True)
+    return _replay_state_dir
+
+
+class JsonStateStore:
+    """JSON document persisted to a local file between runs"""
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def from_settings(cls, settings, filename):
+        return cls(state_path(settings, filename))
+
+    def load(self, default=None):
+        """Load the stored document, returning default if nothing was stored yet"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def save(self, data):
+        """Write the document, replacing the previous file atomically"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+class PickleStateStore(JsonStateStore):
+    """Python objects pickled to a local file between runs"""
+
+    def load(self, default=None):
+        try:
+            with open(self.path, "rb") as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def save(self, data):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,67 @@
+"""
+Incremental HTML parsing for large pages where only a few elements are needed.
+
+Instead of building the full document tree before running selectors, the response
+body is fed to lxml's HTMLPullParser in chunks. Matching elements are yielded as
+soon as their end tag is parsed, and everything that has been processed is
+cleared so the tree never holds more than the element currently being read.
+"""
+
+from lxml import etree
+from parsel import Selector
+
+CHUNK_SIZE = 16 * 1024
+
+
+def streaming_enabled(spider):
+    """Check whether streaming parsing is enabled with CITY_SCRAPERS_STREAMING_PARSE"""
+    settings = getattr(spider, "settings", None)
+    return bool(settings and settings.getbool("CITY_SCRAPERS_STREAMING_PARSE"))
+
+
+def has_class(element, class_name):
+    """Check whether an lxml element has a CSS class"""
+    return class_name in (element.get("class") or "").split()
+
+
+def iter_html_elements(response, match, tags=None, chunk_size=CHUNK_SIZE):
+    """Yield a Selector for each element in a response matching a predicate.
+
+    Elements are yielded in the order their end tags appear. Each element and
+    everything before it in the document is cleared once the consumer moves on to
+    the next one, so values must be extracted from the Selector before advancing
+    the iterator.
+
+    :param response: HtmlResponse to parse
+    :param match: Function taking an lxml element and returning whether it matches
+    :param tags: Optional tag name or list of tag names that can match, which
+                 avoids checking every element in the document
+    :param chunk_size: Number of bytes fed to the parser at a time
+    :return: Iterator of Selectors rooted at matching elements
+    """
+    parser = etree.HTMLPullParser(events=("end",), tag=tags, encoding=response.encoding)
+    body = response.body
+    for offset in range(0, len(body) + 1, chunk_size):
+        if offset < len(body):
+            parser.feed(body[offset : offset + chunk_size])
+        else:
+            parser.close()
+        for _, element in parser.read_events():
+            if not match(element):
+                continue
+            yield Selector(root=element, type="html")
+            # matches nested in another match are needed until the outer one ends
+            if not any(match(ancestor) for ancestor in element.iterancestors()):
+                _clear(element)
+
+
+def _clear(element):
+    """Free a processed element and everything preceding it in the document"""
+    element.clear(keep_tail=True)
+    node = element
+    parent = node.getparent()
+    while parent is not None:
+        while node.getprevious() is not None:
+            del parent[0]
+        node = parent
+        parent = node.getparent()
@@ -0,0 +1,141 @@
+import json
+import queue
+import threading
+import time
+from collections import Counter
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+WAYBACK_SAVE_URL = "https://web.archive.org/save/"
+WAYBACK_POST_URL = "https://pragma.archivelab.org"
+
+
+class WaybackQueue:
+    """Submits URLs to the Wayback Machine from a fixed pool of background threads.
+
+    Submissions that fail with a connection error, a 429 or a 5xx response are
+    retried with exponential backoff, and a 429 pauses every worker. URLs that
+    haven't been submitted when the queue is closed are returned so they can be
+    saved and retried on the next run.
+    """
+
+    def __init__(
+        self,
+        endpoint=WAYBACK_SAVE_URL,
+        is_post=False,
+        workers=4,
+        max_retries=3,
+        backoff=2.0,
+        timeout=60,
+        user_agent=None,
+        on_success=None,
+    ):
+        self.endpoint = endpoint
+        self.is_post = is_post
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.on_success = on_success
+        self.counts = Counter()
+        self.latencies = []
+        self._queue = queue.Queue()
+        self._threads = []
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pause_until = 0
+
+    def start(self):
+        for idx in range(self.workers):
+            thread = threading.Thread(
+                target=self._work, name=f"wayback-{idx}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def put(self, url):
+        self._count("queued")
+        self._queue.put(url)
+
+    def close(self, timeout=None):
+        """Wait up to timeout seconds for queued URLs to be sent and stop the workers
+
+        :param timeout: Seconds to wait for the queue to drain, None to wait for all
+        :return: List of URLs that were not submitted
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks and (
+            deadline is None or time.monotonic() < deadline
+        ):
+            time.sleep(0.05)
+        self._stopping.set()
+        for thread in self._threads:
+            thread.join()
+        while True:
+            try:
+                self._pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return self._pending
+
+    def _count(self, key, value=1):
+        with self._lock:
+            self.counts[key] += value
+
+    def _work(self):
+        while not self._stopping.is_set():
+            try:
+                url = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                self._submit(url)
+            finally:
+                self._queue.task_done()
+
+    def _submit(self, url):
+        for attempt in range(self.max_retries + 1):
+            pause = self._pause_until - time.monotonic()
+            if pause > 0 and self._stopping.wait(pause):
+                break
+            start = time.monotonic()
+            try:
+                with urlopen(self._request(url), timeout=self.timeout):
+                    pass
+            except HTTPError as e:
+                if e.code != 429 and e.code < 500:
+                    self._count("failed")
+                    return
+                if e.code == 429:
+                    self._pause_until = time.monotonic() + 60
+            except (URLError, OSError):
+                pass
+            else:
+                with self._lock:
+                    self.counts["sent"] += 1
+                    self.latencies.append(time.monotonic() - start)
+                if self.on_success is not None:
+                    self.on_success(url)
+                return
+            if attempt == self.max_retries:
+                self._count("failed")
+                return
+            self._count("retried")
+            if self._stopping.wait(self.backoff * 2**attempt):
+                break
+        with self._lock:
+            self._pending.append(url)
+
+    def _request(self, url):
+        headers = {"User-Agent": self.user_agent} if self.user_agent else {}
+        if self.is_post:
+            headers["Content-Type"] = "application/json"
+            return Request(
+                self.endpoint,
+                data=json.dumps({"url": url}).encode(),
+                headers=headers,
+                method="POST",
+            )
+        return Request(self.endpoint + url, headers=headers)
@@ -0,0 +1,17 @@
+from city_scrapers.commands.crawlall import spider_failure_reason
+
+
+def test_finished_spider_succeeds():
+    assert spider_failure_reason({"finish_reason": "finished"}) is None
+
+
+def test_closed_spider_fails():
+    assert (
+        spider_failure_reason({"finish_reason": "closespider_errorcount"})
+        == "closed with reason 'closespider_errorcount'"
+    )
+
+
+def test_spider_with_errors_fails():
+    stats = {"finish_reason": "finished", "log_count/ERROR": 3}
+    assert spider_failure_reason(stats) == "logged 3 errors"
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import pytest
+from dateutil.parser import parse as dateutil_parse
+from dateutil.tz import tzoffset, tzutc
+
+from city_scrapers.dates import parse_datetime
+
+
+@pytest.mark.parametrize(
+    "value,kwargs",
+    [
+        ("2024-10-08T17:30:00-05:00", {"ignoretz": True}),
+        ("2024-10-08T17:30:00-05:00", {}),
+        ("2024-12-03T10:00:00Z", {}),
+        ("2024-12-03T10:00:00", {}),
+        ("2024-12-03", {}),
+        ("August 27, 2024 5:30 PM", {}),
+        ("August 27, 2024  \n 5:30 PM ", {}),
+        ("June 06, 2022 6:00PM", {}),
+        ("September 9, 2024 12:00AM", {}),
+        ("Sept. 9, 2024", {}),
+        ("1/10/2024 12:00:00 AM", {"dayfirst": True}),
+        ("10/10/2024 12:30:00 PM", {"dayfirst": True}),
+        ("10/1/2024 2:00 PM", {}),
+        ("Tuesday, October 8, 2024", {}),
+    ],
+)
+def test_matches_dateutil(value, kwargs):
+    assert parse_datetime(value, **kwargs) == dateutil_parse(value, **kwargs)
+
+
+def test_timezone_offsets():
+    assert parse_datetime("2024-10-08T17:30:00-05:00").utcoffset() == tzoffset(
+        None, -5 * 3600
+    ).utcoffset(None)
+    assert parse_datetime("2024-12-03T10:00:00Z").utcoffset() == tzutc().utcoffset(None)
+
+
+def test_ignoretz_returns_naive():
+    assert parse_datetime("2024-10-08T17:30:00-05:00", ignoretz=True) == datetime(
+        2024, 10, 8, 17, 30
+    )
+
+
+def test_invalid_known_format_falls_back_to_dateutil():
+    with pytest.raises(ValueError):
+        parse_datetime("13/13/2024 12:00:00 AM", dayfirst=True)
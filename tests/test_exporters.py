@@ -0,0 +1,59 @@
+import gzip
+import json
+from datetime import datetime
+
+from city_scrapers_core.items import Meeting
+
+from city_scrapers.exporters import INDEX_SUFFIX, CompressedJsonLinesItemExporter
+
+
+def meeting(spider, day):
+    return Meeting(
+        id=f"{spider}/202301{day:02}1800/x/board",
+        title="Board",
+        start=datetime(2023, 1, day, 18),
+    )
+
+
+def export(path, items, **kwargs):
+    with open(path, "wb") as f:
+        exporter = CompressedJsonLinesItemExporter(f, **kwargs)
+        exporter.start_exporting()
+        for item in items:
+            exporter.export_item(item)
+        exporter.finish_exporting()
+
+
+def test_export_is_readable_gzip(tmp_path):
+    path = tmp_path / "feed.jsonl.gz"
+    items = [meeting("a", day) for day in range(1, 11)]
+    export(path, items, chunk_size=200)
+    with gzip.open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["id"] for line in lines] == [item["id"] for item in items]
+    assert lines[0]["start"] == "2023-01-01 18:00:00"
+
+
+def test_index_seeks_chunks(tmp_path):
+    path = tmp_path / "feed.jsonl.gz"
+    items = [meeting("a", 3), meeting("a", 1), meeting("b", 5), meeting("b", 2)]
+    export(path, items)
+    with open(f"{path}{INDEX_SUFFIX}") as f:
+        index = json.load(f)
+    assert index["items"] == 4
+    assert len(index["chunks"]) == 2
+    assert index["spiders"]["a"] == {
+        "items": 2,
+        "chunks": [0],
+        "min_start": "2023-01-01 18:00:00",
+        "max_start": "2023-01-03 18:00:00",
+    }
+
+    chunk = index["chunks"][index["spiders"]["b"]["chunks"][0]]
+    with open(path, "rb") as f:
+        f.seek(chunk["offset"])
+        data = gzip.decompress(f.read(chunk["length"]))
+    assert [json.loads(line)["id"] for line in data.splitlines()] == [
+        items[2]["id"],
+        items[3]["id"],
+    ]
@@ -0,0 +1,80 @@
+import sys
+
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.extensions import HotPathProfilerExtension
+
+
+class ProfiledSpider(Spider):
+    name = "profiled"
+
+    def parse(self, response, sample):
+        sample()
+        self._get_status(sample)
+
+    def _get_status(self, sample):
+        sample()
+
+
+class ProfiledPipeline:
+    def process_item(self, item, spider, sample):
+        sample()
+        return item
+
+
+def test_profiler(tmp_path):
+    crawler = get_crawler(
+        ProfiledSpider,
+        {
+            "CITY_SCRAPERS_PROFILE": True,
+            "CITY_SCRAPERS_PROFILE_INTERVAL": 0.01,
+            "CITY_SCRAPERS_PROFILE_DIR": str(tmp_path),
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    extension = HotPathProfilerExtension.from_crawler(crawler)
+
+    def sample():
+        # Take a sample of the caller's stack like the sampling thread would
+        extension._add_sample(sys._getframe(1), spider)
+
+    spider.parse(None, sample)
+    ProfiledPipeline().process_item({}, spider, sample)
+    # Samples that don't include the spider are ignored
+    sample()
+    extension.spider_closed(spider)
+
+    stats = crawler.stats.get_stats(spider)
+    assert stats["profile/samples"] == 3
+    assert stats["profile/callback/parse/ms"] == 20.0
+    assert stats["profile/spider_method/parse/ms"] == 10.0
+    assert stats["profile/spider_method/_get_status/ms"] == 10.0
+    assert stats["profile/pipeline/ProfiledPipeline/ms"] == 10.0
+    assert "profile/callback/sample/ms" not in stats
+
+    with open(stats["profile/output"]) as f:
+        lines = f.read().splitlines()
+    assert len(lines) == 3
+    stack = f"{__name__}:test_profiler;{__name__}:parse;{__name__}:_get_status 1"
+    assert any(line.endswith(stack) for line in lines)
+
+
+def test_profiler_thread(tmp_path):
+    crawler = get_crawler(
+        ProfiledSpider,
+        {
+            "CITY_SCRAPERS_PROFILE": True,
+            "CITY_SCRAPERS_PROFILE_DIR": str(tmp_path),
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    extension = HotPathProfilerExtension.from_crawler(crawler)
+
+    extension.spider_opened(spider)
+    assert extension._thread.is_alive()
+    extension.spider_closed(spider)
+    assert extension._thread is None
+    assert crawler.stats.get_value("profile/output", spider=spider)
@@ -1,11 +1,15 @@
+import json
 from datetime import datetime
 from os.path import dirname, join
-from unittest.mock import MagicMock, patch
 
 import pytest
 from city_scrapers_core.constants import COMMISSION
 from city_scrapers_core.utils import file_response
 from freezegun import freeze_time
+from scrapy import Request
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+from twisted.python.failure import Failure
 
 from city_scrapers.spiders.fortx_Fort_Worth_Boards import FortxFortWorthBoardsSpider
 
@@ -362,15 +366,30 @@ parsed_item_data = [
         "success": True,
     },
 ]
-with patch("requests.get") as mock_get:
-    mocks = []
-    for data in parsed_item_data:
-        mock = MagicMock()
-        mock.json.return_value = data
-        mocks.append(mock)
-
-    mock_get.side_effect = mocks
-    parsed_items = [item for item in spider.parse(test_response)]
+info_requests = list(spider.parse(test_response))
+# parsed_item_data has the response for each calendar item, and recurring items
+# share the same response
+info_data = dict(
+    zip(
+        [
+            spider._parse_info_url(item)
+            for day in test_response.json()["data"]
+            for item in day["Items"]
+        ],
+        parsed_item_data,
+    )
+)
+parsed_items = []
+for request in info_requests:
+    data = info_data[request.url]
+    info_response = TextResponse(
+        url=request.url,
+        request=request,
+        body=json.dumps(data),
+        encoding="utf-8",
+    )
+    parsed_items.extend(request.callback(info_response, **request.cb_kwargs))
+parsed_items.sort(key=lambda item: item["start"])
 
 freezer.stop()
 
@@ -379,6 +398,17 @@ def test_count():
     assert len(parsed_items) == 18
 
 
+def test_info_requests():
+    assert len(info_requests) == 15
+    assert (
+        info_requests[0].url
+        == "https://www.fortworthtexas.gov/ocapi/get/contentinfo?calendarId=788ffb59-05d1-457d-b9dd-423d4b95a06e&contentId=e3182d81-2385-4796-809f-8a330d1c7ec9&language=en-US&mainContentId=e3182d81-2385-4796-809f-8a330d1c7ec9"  # noqa
+    )
+    # recurring meetings reuse the same info URL on different dates
+    assert len(info_requests[0].cb_kwargs["meetings"]) == 4
+    assert info_requests[0].headers.get("User-Agent") == b""
+
+
 def test_title():
     assert (
         parsed_items[0]["title"] == "Notice of Public Comment for Brownsfields Program"
@@ -459,3 +489,200 @@ def test_classification():
 @pytest.mark.parametrize("item", parsed_items)
 def test_all_day(item):
     assert item["all_day"] is False
+
+
+def test_info_cache(tmp_path):
+    crawler = get_crawler(
+        FortxFortWorthBoardsSpider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_CONTENTINFO_TTL_HOURS": 48,
+        },
+    )
+    cached_spider = crawler._create_spider()
+    for request in cached_spider.parse(test_response):
+        info_response = TextResponse(
+            url=request.url,
+            request=request,
+            body=json.dumps(info_data[request.url]),
+            encoding="utf-8",
+        )
+        list(request.callback(info_response, **request.cb_kwargs))
+    cached_spider.closed("finished")
+
+    cached_spider = crawler._create_spider()
+    items = list(cached_spider.parse(test_response))
+    assert len(items) == 18
+    assert not any(isinstance(item, Request) for item in items)
+    assert sorted(item["id"] for item in items) == sorted(
+        item["id"] for item in parsed_items
+    )
+    assert crawler.stats.get_value("contentinfo/cache_hits") == 15
+
+
+def test_info_in_flight():
+    crawler = get_crawler(FortxFortWorthBoardsSpider)
+    in_flight_spider = crawler._create_spider()
+    requests = list(in_flight_spider.parse(test_response))
+    assert crawler.stats.get_value("contentinfo/coalesced") == 3
+    # A second calendar response with later occurrences of a recurring meeting
+    # arrives before any contentinfo responses
+    calendar_day = dict(test_response.json()["data"][0])
+    calendar_day["Items"] = [
+        dict(calendar_day["Items"][0], DateTime=f"{day}/10/2024 12:00:00 AM")
+        for day in [5, 6]
+    ]
+    later_response = TextResponse(
+        url=test_response.url,
+        body=json.dumps({"data": [calendar_day]}),
+        encoding="utf-8",
+    )
+    assert list(in_flight_spider.parse(later_response)) == []
+    assert crawler.stats.get_value("contentinfo/coalesced") == 5
+
+    request = requests[0]
+    # Responses are matched to pending meetings by the requested URL, even if they
+    # were redirected
+    info_response = TextResponse(
+        url=f"{request.url}&redirected=1",
+        request=request,
+        body=json.dumps(info_data[request.url]),
+        encoding="utf-8",
+    )
+    items = list(request.callback(info_response, **request.cb_kwargs))
+    assert [item["start"].day for item in items] == [1, 2, 3, 4, 5, 6]
+
+    # Once fetched, the response is reused without another request
+    items = list(in_flight_spider.parse(later_response))
+    assert [item["start"].day for item in items] == [5, 6]
+
+
+def test_info_failed():
+    failed_spider = FortxFortWorthBoardsSpider()
+    request = next(failed_spider.parse(test_response))
+    failure = Failure(TimeoutError())
+    failure.request = request
+    failed_spider._info_failed(failure)
+    # The URL is requested again for meetings parsed after the failure
+    retried = list(failed_spider.parse(test_response))
+    assert request.url in [retry.url for retry in retried]
+
+    # Requests that weren't made by this spider instance can fail too
+    FortxFortWorthBoardsSpider()._info_failed(failure)
+
+
+def test_output_not_replayed():
+    # Output also depends on cached contentinfo and calendar windows, so it can't be
+    # replayed based on the calendar response alone
+    assert not getattr(FortxFortWorthBoardsSpider, "replay_unchanged", False)
+
+
+def crawl_windows(crawler, fail_windows=False, ignore_windows=False):
+    """Run the windowed start requests with the test calendar repeated twice for
+    each window, processing requests in the order they're made and returning the
+    calendar requests and scraped meetings. Each window only gets its own meetings
+    unless ignore_windows is set.
+    """
+    windowed_spider = crawler._create_spider()
+    calendar_requests = list(windowed_spider.start_requests())
+    pending = list(calendar_requests)
+    items = []
+    while pending:
+        request = pending.pop(0)
+        if request.callback == windowed_spider._parse_window:
+            if fail_windows:
+                continue
+            data = test_response.json()["data"]
+            if not ignore_windows:
+                data = windowed_spider._window_days(data, request.cb_kwargs["window"])
+            body = json.dumps({"data": data * 2})
+        elif request.callback == windowed_spider._parse_info:
+            body = json.dumps(info_data[request.url])
+        else:
+            body = ""
+        response = TextResponse(
+            url=request.url, request=request, body=body, encoding="utf-8"
+        )
+        for output in request.callback(response, **request.cb_kwargs):
+            if isinstance(output, Request):
+                pending.append(output)
+            else:
+                items.append(output)
+    windowed_spider.closed("finished")
+    return calendar_requests, items
+
+
+@freeze_time("2024-12-15")
+def test_calendar_windows(tmp_path):
+    crawler = get_crawler(
+        FortxFortWorthBoardsSpider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_CONTENTINFO_TTL_HOURS": 0,
+            "CITY_SCRAPERS_CALENDAR_WINDOW_DAYS": 30,
+            "CITY_SCRAPERS_CALENDAR_PAST_DAYS": 90,
+            "CITY_SCRAPERS_CALENDAR_FUTURE_DAYS": 30,
+            "CITY_SCRAPERS_CALENDAR_REFRESH_DAYS": 31,
+        },
+    )
+    calendar_requests, items = crawl_windows(crawler)
+    assert len(calendar_requests) == 5
+    assert (
+        calendar_requests[0].url
+        == "https://www.fortworthtexas.gov/ocapi/calendars/getcalendaritems?Ids=788ffb59-05d1-457d-b9dd-423d4b95a06e&LanguageCode=en-US&StartDate=2024-09-12&EndDate=2024-10-11"  # noqa
+    )
+    assert [request.cb_kwargs["historical"] for request in calendar_requests] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+    # Each window gets its meetings twice, but each meeting is only output once,
+    # with one request per info URL
+    assert sorted(item["id"] for item in items) == sorted(
+        item["id"] for item in parsed_items
+    )
+    assert crawler.stats.get_value("calendar/duplicates") == 18
+    assert crawler.stats.get_value("contentinfo/cache_hits") is None
+
+    # Cached windows are parsed even if none of the windows can be fetched
+    calendar_requests, items = crawl_windows(crawler, fail_windows=True)
+    assert len(calendar_requests) == 4
+    assert calendar_requests[0].url == "data:,"
+    assert calendar_requests[0].cb_kwargs["windows"] == [
+        "2024-09-12/2024-10-11",
+        "2024-10-12/2024-11-10",
+    ]
+    assert len(items) == 18
+    assert crawler.stats.get_value("calendar/windows_cached") == 2
+
+
+@freeze_time("2024-12-15")
+def test_calendar_windows_ignored(tmp_path):
+    crawler = get_crawler(
+        FortxFortWorthBoardsSpider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_CALENDAR_WINDOW_DAYS": 30,
+            "CITY_SCRAPERS_CALENDAR_PAST_DAYS": 90,
+            "CITY_SCRAPERS_CALENDAR_FUTURE_DAYS": 30,
+        },
+    )
+    # The test calendar falls in the first window, so the second window's response
+    # shows the API ignored the window and the whole calendar is parsed from it
+    calendar_requests, items = crawl_windows(crawler, ignore_windows=True)
+    assert len(calendar_requests) == 5
+    assert sorted(item["id"] for item in items) == sorted(
+        item["id"] for item in parsed_items
+    )
+    assert crawler.stats.get_value("calendar/windows_fetched") == 2
+    assert crawler.stats.get_value("calendar/windows_ignored") == 1
+    assert crawler.stats.get_value("calendar/windows_skipped") == 3
+
+    # Windows that haven't been requested yet are skipped
+    windowed_spider = crawler._create_spider()
+    start_requests = windowed_spider.start_requests()
+    next(start_requests)
+    windowed_spider._windows_ignored = True
+    assert list(start_requests) == []
@@ -5,6 +5,7 @@ import pytest
 from city_scrapers_core.constants import BOARD
 from city_scrapers_core.utils import file_response
 from freezegun import freeze_time
+from scrapy.utils.test import get_crawler
 
 from city_scrapers.spiders.fortx_Fort_Worth_Isd import FortxFortWorthIsdSpider
 
@@ -83,3 +84,13 @@ def test_classification():
 @pytest.mark.parametrize("item", parsed_items)
 def test_all_day(item):
     assert item["all_day"] is False
+
+
+def test_streaming_parse():
+    crawler = get_crawler(
+        FortxFortWorthIsdSpider, {"CITY_SCRAPERS_STREAMING_PARSE": True}
+    )
+    streaming_spider = crawler._create_spider()
+    with freeze_time("2024-10-09"):
+        streaming_items = list(streaming_spider.parse(test_response))
+    assert streaming_items == parsed_items
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from os.path import dirname, join
 
@@ -5,6 +6,8 @@ import pytest
 from city_scrapers_core.constants import COMMISSION
 from city_scrapers_core.utils import file_response
 from freezegun import freeze_time
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
 
 from city_scrapers.spiders.fortx_Tarrant_County_Commissioners_Court import (
     FortxTarrantCountyCommissionersCourtSpider,
@@ -108,3 +111,70 @@ def test_classification():
 @pytest.mark.parametrize("item", parsed_items)
 def test_all_day(item):
     assert item["all_day"] is False
+
+
+def crawl_archive(tmp_path, data):
+    crawler = get_crawler(
+        FortxTarrantCountyCommissionersCourtSpider,
+        {"CITY_SCRAPERS_INCREMENTAL": True, "CITY_SCRAPERS_STATE_DIR": str(tmp_path)},
+    )
+    incremental_spider = crawler._create_spider()
+    list(incremental_spider.start_requests())
+    response = TextResponse(
+        url=archived_meetings.url, body=json.dumps(data), encoding="utf-8"
+    )
+    items = list(incremental_spider.parse(response))
+    incremental_spider.closed("finished")
+    return items
+
+
+def test_incremental_archive(tmp_path):
+    data = json.loads(archived_meetings.text)
+    with freeze_time("2024-11-25"):
+        assert len(crawl_archive(tmp_path, data)) == 9
+    with freeze_time("2024-11-26"):
+        assert crawl_archive(tmp_path, data) == []
+
+        data["data"][3]["minutesAttachmentId"] = "new-minutes-id"
+        new_meeting = {
+            **data["data"][0],
+            "id": "new-meeting-id",
+            "meetingStartDateTime": "2024-12-10T10:00:00",
+        }
+        data["data"].append(new_meeting)
+        items = crawl_archive(tmp_path, data)
+    assert [item["start"] for item in items] == [
+        parse_archived_start(data["data"][3]),
+        datetime(2024, 12, 10, 10, 0),
+    ]
+    assert items[0]["links"][1]["title"] == "Minutes"
+
+
+def test_incremental_archive_pruned(tmp_path):
+    data = json.loads(archived_meetings.text)
+    with freeze_time("2024-11-25"):
+        crawl_archive(tmp_path, data)
+    removed = data["data"].pop(0)
+    with freeze_time("2024-11-26"):
+        assert crawl_archive(tmp_path, data) == []
+    with open(tmp_path / f"{spider.name}.json") as f:
+        state = json.load(f)
+    assert len(state["meetings"]) == 8
+    assert removed["id"] not in state["meetings"]
+
+
+def test_location_not_shared():
+    assert parsed_items[0]["location"] is not parsed_items[1]["location"]
+    assert parsed_items[0]["location"] is not spider.location
+
+
+def test_incremental_archive_full_sweep(tmp_path):
+    data = json.loads(archived_meetings.text)
+    with freeze_time("2024-11-25"):
+        crawl_archive(tmp_path, data)
+    with freeze_time("2024-12-02"):
+        assert len(crawl_archive(tmp_path, data)) == 9
+
+
+def parse_archived_start(item):
+    return datetime.fromisoformat(item["meetingStartDateTime"])
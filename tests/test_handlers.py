@@ -0,0 +1,227 @@
+import json
+import runpy
+from os.path import dirname, join
+from types import SimpleNamespace
+
+import pytest
+from city_scrapers_core.utils import file_response
+from freezegun import freeze_time
+from scrapy import Request
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler, ScrapyAgent
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse, TextResponse
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer
+from twisted.internet.task import Clock
+
+from city_scrapers.handlers import (
+    ConnectionCounter,
+    InstrumentedConnectionPool,
+    PooledHTTPDownloadHandler,
+    RecordReplayDownloadHandler,
+)
+from city_scrapers.settings import base as base_settings
+from city_scrapers.spiders.fortx_Fort_Worth_Isd import FortxFortWorthIsdSpider
+from city_scrapers.state import state_path
+
+
+class FakeEndpoint:
+    def connect(self, factory):
+        from twisted.internet.defer import succeed
+
+        return succeed(fake_connection())
+
+
+class FakeConnection:
+    state = "QUIESCENT"
+    transport = SimpleNamespace(loseConnection=lambda: None)
+
+
+def fake_connection():
+    return FakeConnection()
+
+
+def test_pool_counts_reuse():
+    stats = get_crawler().stats
+    pool = InstrumentedConnectionPool(Clock(), ConnectionCounter(stats))
+    pool.retryAutomatically = False
+    key = (b"https", b"www.fortworthtexas.gov", 443)
+
+    connections = []
+    pool.getConnection(key, FakeEndpoint()).addCallback(connections.append)
+    pool._putConnection(key, connections[0])
+    pool.getConnection(key, FakeEndpoint()).addCallback(connections.append)
+    pool.getConnection(key, FakeEndpoint()).addCallback(connections.append)
+
+    assert connections[1] is connections[0]
+    counter = pool.counter
+    assert (counter.new, counter.reused, counter.tls_handshakes) == (2, 1, 2)
+    assert counter.reuse_ratio == 0.333
+    assert stats.get_value("connections/reused") == 1
+    assert stats.get_value("connections/tls_handshakes") == 2
+
+
+def test_pool_host_sizes(monkeypatch):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_POOL_SIZE": 4,
+            "CITY_SCRAPERS_POOL_HOST_SIZES": {
+                "tarrant-agendamanagement-public.techsharetx.gov": 1
+            },
+        },
+    )
+    handler = PooledHTTPDownloadHandler(crawler.settings, crawler)
+    pools = []
+    monkeypatch.setattr(
+        ScrapyAgent,
+        "download_request",
+        lambda agent, request: pools.append(agent._pool),
+    )
+    monkeypatch.setattr(
+        HTTP11DownloadHandler,
+        "download_request",
+        lambda self, request, spider: pools.append(self._pool),
+    )
+    for url in [
+        "https://tarrant-agendamanagement-public.techsharetx.gov/publicportal",
+        "https://www.fwisd.org/board",
+    ]:
+        handler.download_request(Request(url), crawler._create_spider("test"))
+    assert [pool.maxPersistentPerHost for pool in pools] == [1, 4]
+    # Both pools count connections together
+    assert pools[0].counter is pools[1].counter
+
+
+def replay_handler(tmp_path, mode):
+    crawler = get_crawler(
+        Spider,
+        {"CITY_SCRAPERS_REPLAY": mode, "CITY_SCRAPERS_REPLAY_DIR": str(tmp_path)},
+    )
+    spider = crawler._create_spider("test")
+    crawler.stats.open_spider(spider)
+    return RecordReplayDownloadHandler(crawler.settings, crawler), spider
+
+
+def download(handler, request, spider):
+    results = []
+    handler.download_request(request, spider).addBoth(results.append)
+    return results[0]
+
+
+def test_record_replay(tmp_path, monkeypatch):
+    def fake_download(self, request, spider):
+        return defer.succeed(
+            TextResponse(
+                url=request.url,
+                headers={"Content-Type": "application/json"},
+                body=json.dumps({"body": request.body.decode()}),
+                encoding="utf-8",
+            )
+        )
+
+    monkeypatch.setattr(HTTP11DownloadHandler, "download_request", fake_download)
+    url = "https://tarrant-agendamanagement-public.techsharetx.gov/publicportal/api/meetings/readArchived"  # noqa
+    requests = [
+        Request(url, method="POST", body=json.dumps({"committeeId": committee_id}))
+        for committee_id in ["a", "b"]
+    ]
+    handler, spider = replay_handler(tmp_path, "record")
+    for request in requests:
+        download(handler, request, spider)
+    handler.close()
+    assert handler.stats.get_value("replay/recorded", spider=spider) == 2
+
+    monkeypatch.setattr(HTTP11DownloadHandler, "download_request", None)
+    handler, spider = replay_handler(tmp_path, "replay")
+    for request in requests:
+        response = download(handler, request, spider)
+        assert isinstance(response, TextResponse)
+        assert "replayed" in response.flags
+        assert response.request is request
+        assert response.json() == {"body": request.body.decode()}
+
+    failure = download(handler, Request(url, method="POST", body="{}"), spider)
+    assert failure.check(IgnoreRequest)
+    assert handler.stats.get_value("replay/replayed", spider=spider) == 2
+    assert handler.stats.get_value("replay/missing", spider=spider) == 1
+    handler.close()
+
+
+def test_replay_response_type(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        HTTP11DownloadHandler,
+        "download_request",
+        lambda self, request, spider: defer.succeed(
+            HtmlResponse(
+                url=request.url,
+                status=404,
+                headers={"Content-Type": "text/html; charset=utf-8"},
+                body=b"<html></html>",
+            )
+        ),
+    )
+    request = Request("https://www.fwisd.org/missing")
+    handler, spider = replay_handler(tmp_path, "record")
+    download(handler, request, spider)
+    handler.close()
+
+    handler, spider = replay_handler(tmp_path, "replay")
+    response = download(handler, request, spider)
+    assert isinstance(response, HtmlResponse)
+    assert response.status == 404
+    assert response.headers["Content-Type"] == b"text/html; charset=utf-8"
+    handler.close()
+
+
+def test_replay_mode_required(tmp_path):
+    with pytest.raises(ValueError):
+        replay_handler(tmp_path, "true")
+
+
+def test_replay_state_dir(tmp_path):
+    settings = {"CITY_SCRAPERS_STATE_DIR": str(tmp_path)}
+    assert state_path(get_crawler(Spider, settings).settings, "a.json") == str(
+        tmp_path / "a.json"
+    )
+    # Recording and replaying never read or change the normal state directory
+    for mode in ["record", "replay"]:
+        crawler = get_crawler(Spider, {**settings, "CITY_SCRAPERS_REPLAY": mode})
+        assert not state_path(crawler.settings, "a.json").startswith(str(tmp_path))
+
+
+@pytest.mark.parametrize("mode", ["record", "replay"])
+def test_replay_disables_http_cache(mode, monkeypatch):
+    monkeypatch.setenv("HTTPCACHE_ENABLED", "true")
+    monkeypatch.setenv("CITY_SCRAPERS_REPLAY", mode)
+    settings = runpy.run_path(base_settings.__file__)
+    assert settings["HTTPCACHE_ENABLED"] is False
+
+
+@freeze_time("2024-10-09")
+def test_replay_fixture(tmp_path, monkeypatch):
+    fixture = file_response(
+        join(dirname(__file__), "files", "fortx_Fort_Worth_Isd.html"),
+        url="https://www.fwisd.org/board/board-of-education/board-calendar",
+    )
+    monkeypatch.setattr(
+        HTTP11DownloadHandler,
+        "download_request",
+        lambda self, request, spider: defer.succeed(
+            fixture.replace(url=request.url, request=request)
+        ),
+    )
+    request = Request(fixture.url)
+    handler, spider = replay_handler(tmp_path, "record")
+    download(handler, request, spider)
+    handler.close()
+
+    monkeypatch.setattr(HTTP11DownloadHandler, "download_request", None)
+    handler, spider = replay_handler(tmp_path, "replay")
+    response = download(handler, request, spider)
+    handler.close()
+    isd_spider = FortxFortWorthIsdSpider()
+    items = list(isd_spider.parse(response))
+    assert len(items) == 2
+    assert items == list(isd_spider.parse(fixture))
@@ -0,0 +1,62 @@
+import pickle
+from datetime import datetime
+
+import pytest
+from city_scrapers_core.constants import BOARD, PASSED
+from city_scrapers_core.items import Meeting
+from city_scrapers_core.spiders import CityScrapersSpider
+
+from city_scrapers.items import MeetingRecord
+
+
+def test_item_access():
+    record = MeetingRecord(title="Board Meeting", start=datetime(2023, 1, 10, 18))
+    assert record["title"] == "Board Meeting"
+    assert "title" in record
+    assert "end" not in record
+    assert record.get("end") is None
+    assert record.get("description", "") == ""
+    with pytest.raises(KeyError):
+        record["end"]
+    with pytest.raises(KeyError):
+        record["agenda"] = "Agenda"
+    record["end"] = None
+    assert "end" in record
+
+
+def test_interns_titles():
+    title = "".join(["Commissioners ", "Court"])
+    assert (
+        MeetingRecord(title=title)["title"]
+        is MeetingRecord(title="Commissioners Court")["title"]
+    )
+
+
+def test_to_meeting():
+    spider = CityScrapersSpider(name="test")
+    record = MeetingRecord(
+        title="Board Meeting",
+        description="",
+        classification=BOARD,
+        start=datetime(2023, 1, 10, 18),
+        links=[],
+    )
+    record["status"] = spider._get_status(record)
+    record["id"] = spider._get_id(record)
+    meeting = record.to_meeting()
+    assert isinstance(meeting, Meeting)
+    assert dict(meeting) == {
+        "id": "test/202301101800/x/board_meeting",
+        "title": "Board Meeting",
+        "description": "",
+        "classification": BOARD,
+        "status": PASSED,
+        "start": datetime(2023, 1, 10, 18),
+        "links": [],
+    }
+
+
+def test_pickle():
+    record = MeetingRecord(title="Board Meeting", start=datetime(2023, 1, 10, 18))
+    restored = pickle.loads(pickle.dumps(record))
+    assert dict(restored.to_meeting()) == dict(record.to_meeting())
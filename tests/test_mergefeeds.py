@@ -0,0 +1,71 @@
+import gzip
+import json
+from datetime import datetime
+
+from city_scrapers_core.items import Meeting
+
+from city_scrapers.commands.mergefeeds import merge_runs, read_pieces, sort_feed
+from city_scrapers.exporters import INDEX_SUFFIX, CompressedJsonLinesItemExporter
+
+
+def write_feed(path, starts, compress=False):
+    lines = "\n".join(
+        json.dumps({"id": f"{path.name[0]}/{idx}", "start": start})
+        for idx, start in enumerate(starts)
+    )
+    path.write_bytes(gzip.compress(lines.encode()) if compress else lines.encode())
+
+
+def test_merge_feeds(tmp_path):
+    write_feed(tmp_path / "a.jsonlines", ["2023-01-05T18:00:00", "2023-01-01T18:00:00"])
+    write_feed(
+        tmp_path / "b.jsonl.gz",
+        ["2023-01-03 18:00:00", "2023-01-06 09:00:00"],
+        compress=True,
+    )
+    run_paths = [
+        *sort_feed(str(tmp_path / "a.jsonlines"), str(tmp_path / "a"), "start"),
+        *sort_feed(str(tmp_path / "b.jsonl.gz"), str(tmp_path / "b"), "start"),
+    ]
+    assert len(run_paths) == 2
+
+    assert merge_runs(run_paths, str(tmp_path), "2023-01-04T00:00:00") == (4, 2)
+    latest = (tmp_path / "latest.json").read_text().split("\n")
+    assert [json.loads(line)["id"] for line in latest] == ["a/1", "b/0", "a/0", "b/1"]
+    upcoming = (tmp_path / "upcoming.json").read_text().split("\n")
+    assert [json.loads(line)["id"] for line in upcoming] == ["a/0", "b/1"]
+
+
+def test_read_pieces(tmp_path):
+    path = tmp_path / "feed.jsonl.gz"
+    days = [5, 2, 9, 1, 7, 3, 10, 4, 8, 6]
+    with open(path, "wb") as f:
+        exporter = CompressedJsonLinesItemExporter(f, chunk_size=200)
+        exporter.start_exporting()
+        for day in days:
+            exporter.export_item(
+                Meeting(id=f"a/{day}", title="Board", start=datetime(2023, 1, day, 18))
+            )
+        exporter.finish_exporting()
+    index = json.loads((tmp_path / f"feed.jsonl.gz{INDEX_SUFFIX}").read_text())
+
+    # Chunked feeds are read one chunk at a time
+    pieces = list(read_pieces(str(path)))
+    assert [len(piece) for piece in pieces] == [
+        chunk["items"] for chunk in index["chunks"]
+    ]
+    assert len(pieces) > 1
+    run_paths = sort_feed(str(path), str(tmp_path / "a"), "start")
+    assert len(run_paths) == len(pieces)
+    assert merge_runs(run_paths, str(tmp_path), "2023-01-06T00:00:00") == (10, 5)
+    latest = (tmp_path / "latest.json").read_text().split("\n")
+    assert [json.loads(line)["id"] for line in latest] == [
+        f"a/{day}" for day in range(1, 11)
+    ]
+
+    # Feeds without a matching index are read in batches of lines
+    (tmp_path / f"feed.jsonl.gz{INDEX_SUFFIX}").write_text(
+        json.dumps({**index, "chunks": index["chunks"][:-1]})
+    )
+    pieces = list(read_pieces(str(path), batch_size=4))
+    assert [len(piece) for piece in pieces] == [4, 4, 2]
@@ -0,0 +1,291 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+import pytest
+from city_scrapers_core.constants import PASSED, TENTATIVE
+from city_scrapers_core.items import Meeting
+from freezegun import freeze_time
+from scrapy import Request
+from scrapy.http import HtmlResponse, Response
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.middleware import (
+    AdaptiveThrottleMiddleware,
+    CityScrapersWaybackMiddleware,
+    ConditionalHttpCacheMiddleware,
+    ContentHashMiddleware,
+)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    crawler = get_crawler(
+        Spider,
+        {
+            "HTTPCACHE_ENABLED": True,
+            "HTTPCACHE_DIR": str(tmp_path),
+            "HTTPCACHE_POLICY": "city_scrapers.middleware.ConditionalCachePolicy",
+        },
+    )
+    spider = crawler._create_spider("test")
+    crawler.spider = spider
+    crawler.stats.open_spider(spider)
+    middleware = ConditionalHttpCacheMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    yield middleware, spider
+    middleware.spider_closed(spider)
+
+
+def fetch(middleware, spider, response_kwargs):
+    request = Request("https://www.fwisd.org/board/board-of-education/board-calendar")
+    assert middleware.process_request(request, spider) is None
+    response_cls = HtmlResponse if response_kwargs["status"] == 200 else Response
+    response = response_cls(url=request.url, request=request, **response_kwargs)
+    return request, middleware.process_response(request, response, spider)
+
+
+def test_not_modified_reuses_cached_body(cache):
+    middleware, spider = cache
+    body = b"<html><body>calendar</body></html>"
+    fetch(
+        middleware, spider, {"status": 200, "headers": {"ETag": '"v1"'}, "body": body}
+    )
+    request, response = fetch(middleware, spider, {"status": 304})
+
+    assert request.headers["If-None-Match"] == b'"v1"'
+    assert response.status == 200
+    assert response.body == body
+    assert "not_modified" in response.flags
+    stats = middleware.stats
+    assert stats.get_value("httpcache/miss", spider=spider) == 1
+    assert stats.get_value("httpcache/not_modified", spider=spider) == 1
+    assert stats.get_value("httpcache/bytes_saved", spider=spider) == len(body)
+
+
+def test_changed_response_replaces_cache(cache):
+    middleware, spider = cache
+    fetch(
+        middleware, spider, {"status": 200, "headers": {"ETag": '"v1"'}, "body": b"1"}
+    )
+    _, response = fetch(
+        middleware, spider, {"status": 200, "headers": {"ETag": '"v2"'}, "body": b"2"}
+    )
+    assert response.body == b"2"
+    assert "not_modified" not in response.flags
+
+    request, _ = fetch(middleware, spider, {"status": 304})
+    assert request.headers["If-None-Match"] == b'"v2"'
+
+
+def test_response_without_validators_not_stored(cache):
+    middleware, spider = cache
+    fetch(middleware, spider, {"status": 200, "body": b"no validators"})
+    request, _ = fetch(middleware, spider, {"status": 200, "body": b"no validators"})
+    assert "If-None-Match" not in request.headers
+    assert middleware.stats.get_value("httpcache/miss", spider=spider) == 2
+
+
+def wayback_crawler(tmp_path, budget=0):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_WAYBACK_BUDGET": budget,
+        },
+    )
+    spider = crawler._create_spider("test")
+    crawler.spider = spider
+    crawler.stats.open_spider(spider)
+    middleware = CityScrapersWaybackMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    return middleware, spider
+
+
+def archive(middleware, spider, hrefs):
+    request = Request("https://www.fwisd.org/board/board-of-education/board-calendar")
+    response = HtmlResponse(url=request.url, request=request, body=b"")
+    meeting = Meeting(
+        source=request.url, links=[{"href": href, "title": ""} for href in hrefs]
+    )
+    output = list(middleware.process_spider_output(response, [meeting], spider))
+    assert output[0] is meeting
+    return output[1:]
+
+
+def test_wayback_dedupes_urls(tmp_path):
+    middleware, spider = wayback_crawler(tmp_path)
+    requests = archive(middleware, spider, ["https://a.pdf", "https://a.pdf"])
+    assert [r.meta["wayback_url"] for r in requests] == [
+        "https://www.fwisd.org/board/board-of-education/board-calendar",
+        "https://a.pdf",
+    ]
+    assert archive(middleware, spider, ["https://a.pdf"]) == []
+    assert middleware.stats.get_value("wayback/skipped/duplicate", spider=spider) == 2
+
+
+def test_wayback_skips_archived_urls(tmp_path):
+    middleware, spider = wayback_crawler(tmp_path)
+    requests = archive(middleware, spider, ["https://a.pdf"])
+    for request in requests:
+        response = HtmlResponse(url=request.url, request=request, status=200)
+        middleware.handle_wayback(response)
+    middleware.spider_closed(spider)
+
+    middleware, spider = wayback_crawler(tmp_path)
+    stale = (datetime.now() - timedelta(days=31)).isoformat()
+    middleware.archived["https://b.pdf"] = stale
+    requests = archive(middleware, spider, ["https://b.pdf", "https://c.pdf"])
+    assert [(r.meta["wayback_url"], r.priority) for r in requests] == [
+        ("https://c.pdf", 1),
+        ("https://b.pdf", 0),
+    ]
+    assert middleware.stats.get_value("wayback/skipped/archived", spider=spider) == 1
+
+
+def test_wayback_budget(tmp_path):
+    middleware, spider = wayback_crawler(tmp_path, budget=2)
+    requests = archive(middleware, spider, ["https://a.pdf", "https://b.pdf"])
+    assert len(requests) == 2
+    assert archive(middleware, spider, ["https://c.pdf"]) == []
+    assert middleware.stats.get_value("wayback/skipped/budget", spider=spider) == 2
+
+
+class ReplaySpider(Spider):
+    name = "replay"
+    replay_unchanged = True
+    parse_count = 0
+
+    def parse(self, response):
+        self.parse_count += 1
+        yield Meeting(
+            title=response.text, start=datetime(2023, 1, 10, 18), status=TENTATIVE
+        )
+        yield Request(
+            "https://www.fwisd.org/board/info",
+            callback=self.parse,
+            cb_kwargs={"page": 2},
+        )
+
+
+def replay_crawler(tmp_path, **settings):
+    crawler = get_crawler(
+        ReplaySpider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_CONTENT_HASH": True,
+            **settings,
+        },
+    )
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    middleware = ContentHashMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    return middleware, spider
+
+
+def replay(middleware, spider, body, flags=None):
+    request = Request("https://www.fwisd.org/board", callback=spider.parse)
+    response = HtmlResponse(url=request.url, request=request, body=body, flags=flags)
+    return list(
+        middleware.process_spider_output(response, spider.parse(response), spider)
+    )
+
+
+def test_content_hash_replays_unchanged(tmp_path):
+    with freeze_time("2023-01-01"):
+        middleware, spider = replay_crawler(tmp_path)
+        output = replay(middleware, spider, b"Board")
+        middleware.spider_closed(spider, "finished")
+
+    middleware, spider = replay_crawler(tmp_path)
+    replayed = replay(middleware, spider, b"Board")
+    assert spider.parse_count == 0
+    assert replayed[0]["title"] == output[0]["title"]
+    assert replayed[0]["status"] == PASSED
+    assert replayed[1].url == output[1].url
+    assert replayed[1].callback == spider.parse
+    assert replayed[1].cb_kwargs == {"page": 2}
+    assert middleware.stats.get_value("contenthash/replayed", spider=spider) == 1
+
+    replay(middleware, spider, b"Board of Education")
+    assert spider.parse_count == 1
+
+
+def test_content_hash_force_parse(tmp_path):
+    middleware, spider = replay_crawler(tmp_path)
+    replay(middleware, spider, b"Board")
+    middleware.spider_closed(spider, "finished")
+
+    middleware, spider = replay_crawler(tmp_path, CITY_SCRAPERS_FORCE_PARSE=True)
+    replay(middleware, spider, b"Board")
+    assert spider.parse_count == 1
+    assert middleware.stats.get_value("contenthash/parsed", spider=spider) == 1
+
+
+def test_content_hash_not_modified(tmp_path):
+    settings = {"CITY_SCRAPERS_CONTENT_HASH": False, "HTTPCACHE_ENABLED": True}
+    middleware, spider = replay_crawler(tmp_path, **settings)
+    replay(middleware, spider, b"Board")
+    middleware.spider_closed(spider, "finished")
+
+    # Without content hashing, only responses reused after a 304 are replayed
+    middleware, spider = replay_crawler(tmp_path, **settings)
+    replay(middleware, spider, b"Board")
+    assert spider.parse_count == 1
+    replay(middleware, spider, b"Board", flags=["not_modified"])
+    assert spider.parse_count == 1
+    assert middleware.stats.get_value("contenthash/not_modified", spider=spider) == 1
+
+
+def throttle_crawler(tmp_path):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_ADAPTIVE_THROTTLE": True,
+            "AUTOTHROTTLE_START_DELAY": 1.0,
+            "AUTOTHROTTLE_TARGET_CONCURRENCY": 1.0,
+            "CONCURRENT_REQUESTS_PER_DOMAIN": 8,
+        },
+    )
+    spider = crawler._create_spider("test")
+    downloader = SimpleNamespace(per_slot_settings={}, slots={})
+    crawler.engine = SimpleNamespace(downloader=downloader)
+    crawler.stats.open_spider(spider)
+    middleware = AdaptiveThrottleMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    return middleware, spider
+
+
+def throttle_response(middleware, spider, url, latency, status=200):
+    request = Request(url, meta={"download_latency": latency})
+    request.meta["download_slot"] = urlparse(url).hostname
+    response = HtmlResponse(url=url, request=request, status=status)
+    return middleware.process_response(request, response, spider)
+
+
+def test_adaptive_throttle_per_domain(tmp_path):
+    middleware, spider = throttle_crawler(tmp_path)
+    for _ in range(20):
+        throttle_response(middleware, spider, "https://api.example.com/", 0.1)
+        throttle_response(middleware, spider, "https://slow.example.com/", 3.0)
+    throttle_response(middleware, spider, "https://slow.example.com/", 3.0, 503)
+
+    fast = middleware.profiles["api.example.com"]
+    slow = middleware.profiles["slow.example.com"]
+    assert fast["concurrency"] > slow["concurrency"]
+    assert fast["delay"] < 0.1
+    assert slow["delay"] > 1
+    middleware.spider_closed(spider)
+    stats = middleware.stats
+    assert stats.get_value("throttle/slow.example.com/errors", spider=spider) == 1
+    assert stats.get_value("throttle/api.example.com/requests", spider=spider) == 20
+
+    middleware, spider = throttle_crawler(tmp_path)
+    slot_settings = middleware.crawler.engine.downloader.per_slot_settings
+    assert slot_settings["api.example.com"] == {
+        "concurrency": round(fast["concurrency"]),
+        "delay": fast["delay"],
+    }
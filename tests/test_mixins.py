@@ -0,0 +1,65 @@
+from datetime import datetime
+
+import pytest
+from city_scrapers_core.spiders import CityScrapersSpider
+from freezegun import freeze_time
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.mixins import MemoizedMeetingMixin
+
+
+class MemoizedSpider(MemoizedMeetingMixin, CityScrapersSpider):
+    name = "memoized"
+
+
+@pytest.mark.parametrize(
+    "title,description,text",
+    [
+        ("Commissioners Court", "", ""),
+        ("CANCELLED: Board Meeting", "", ""),
+        ("Board Meeting - Rescheduled", "", ""),
+        ("Board Meeting", "This meeting has been postponed", ""),
+        ("Board Meeting", "", "Cancellation notice"),
+        ("2021 Citizens' Oversight Committee Meeting", "", ""),
+        ("Regular Meeting | Cancelled", "", ""),
+    ],
+)
+@freeze_time("2024-10-04")
+def test_matches_base_spider(title, description, text):
+    base_spider = CityScrapersSpider(name="memoized")
+    spider = MemoizedSpider()
+    for start in [datetime(2024, 10, 1, 18), datetime(2024, 10, 10, 18)]:
+        item = {"title": title, "description": description, "start": start}
+        # Run twice so the second call is answered from the cache
+        for _ in range(2):
+            assert spider._get_status(item, text=text) == base_spider._get_status(
+                item, text=text
+            )
+            assert spider._get_id(item) == base_spider._get_id(item)
+            assert spider._get_id(item, identifier="a/1") == base_spider._get_id(
+                item, identifier="a/1"
+            )
+
+
+def test_bounded_cache():
+    spider = MemoizedSpider()
+    for idx in range(spider.memo_cache_size + 10):
+        spider._get_id({"title": f"Meeting {idx}", "start": datetime(2024, 10, 1)})
+    assert spider._memo_id.cache_info().currsize == spider.memo_cache_size
+
+
+def test_stats():
+    crawler = get_crawler(MemoizedSpider)
+    spider = crawler._create_spider()
+    crawler.stats.open_spider(spider)
+    item = {"title": "Commissioners Court", "start": datetime(2024, 10, 1)}
+    for _ in range(4):
+        spider._get_status(item)
+        spider._get_id(item)
+    spider._get_id({**item, "title": "Special Session"})
+    spider._record_memo_stats(spider)
+
+    assert crawler.stats.get_value("memo/id/hits") == 3
+    assert crawler.stats.get_value("memo/id/misses") == 2
+    assert crawler.stats.get_value("memo/id/hit_rate") == 0.6
+    assert crawler.stats.get_value("memo/status/hit_rate") == 0.75
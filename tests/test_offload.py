@@ -0,0 +1,210 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from os.path import dirname, join
+
+import pytest
+from city_scrapers_core.items import Meeting
+from city_scrapers_core.spiders import CityScrapersSpider
+from city_scrapers_core.utils import file_response
+from freezegun import freeze_time
+from scrapy import Request
+from scrapy.utils.test import get_crawler
+from twisted.internet import defer, reactor
+
+from city_scrapers import offload
+from city_scrapers.middleware import ContentHashMiddleware
+from city_scrapers.offload import _restore_outputs, cpu_bound, parse_in_worker
+from city_scrapers.spiders.fortx_Fort_Worth_Isd import FortxFortWorthIsdSpider
+
+test_response = file_response(
+    join(dirname(__file__), "files", "fortx_Fort_Worth_Isd.html"),
+    url="https://www.fwisd.org/board/board-of-education/board-calendar",
+)
+
+
+class LinkSpider(CityScrapersSpider):
+    name = "links"
+
+    @cpu_bound
+    def parse(self, response, page=1):
+        for link in response.css("a::attr(href)").getall()[:2]:
+            yield Request(
+                response.urljoin(link),
+                callback=self.parse,
+                cb_kwargs={"page": page + 1},
+                meta={"page": page},
+            )
+
+
+class MetaSpider(CityScrapersSpider):
+    name = "meta"
+    replay_unchanged = True
+
+    @cpu_bound
+    def parse(self, response, page=1):
+        yield {
+            "url": response.request.url,
+            "committee": response.meta.get("committee"),
+            "page": response.cb_kwargs.get("page"),
+        }
+
+
+class FailingSpider(CityScrapersSpider):
+    name = "failing"
+
+    @cpu_bound
+    def parse(self, response):
+        raise ValueError("Unexpected page layout")
+
+
+def worker_args(spider_cls, response, name="parse", kwargs=None, meta=None):
+    return (
+        spider_cls,
+        name,
+        type(response),
+        response.url,
+        response.status,
+        dict(response.headers),
+        response.body,
+        response.encoding,
+        kwargs or {},
+        meta or {},
+    )
+
+
+@freeze_time("2024-10-09")
+def test_matches_inline_parse():
+    spider = FortxFortWorthIsdSpider()
+    outputs = parse_in_worker(*worker_args(FortxFortWorthIsdSpider, test_response))
+    items = _restore_outputs(outputs, spider, test_response, 0)
+    assert items == list(spider.parse(test_response))
+    assert all(isinstance(item, Meeting) for item in items)
+
+
+def test_disabled_without_workers():
+    spider = FortxFortWorthIsdSpider.from_crawler(
+        get_crawler(
+            FortxFortWorthIsdSpider, settings_dict={"CITY_SCRAPERS_PARSE_WORKERS": 0}
+        )
+    )
+    assert len(list(spider.parse(test_response))) == 2
+    # Spiders created without a crawler parse inline as well
+    assert len(list(FortxFortWorthIsdSpider().parse(test_response))) == 2
+
+
+def test_requests_round_trip():
+    spider = LinkSpider()
+    outputs = parse_in_worker(
+        *worker_args(LinkSpider, test_response, kwargs={"page": 3})
+    )
+    requests = _restore_outputs(outputs, spider, test_response, 0)
+    assert len(requests) == 2
+    for request in requests:
+        assert request.callback == spider.parse
+        assert request.cb_kwargs == {"page": 4}
+        assert request.meta["page"] == 3
+
+
+def test_request_meta():
+    request = Request(
+        test_response.url,
+        meta={"committee": "board", "unpicklable": lambda: None},
+        cb_kwargs={"page": 2},
+    )
+    response = test_response.replace(request=request)
+    meta = offload._picklable_meta(response)
+    assert meta == {"committee": "board"}
+    outputs = parse_in_worker(
+        *worker_args(MetaSpider, response, kwargs={"page": 2}, meta=meta)
+    )
+    assert _restore_outputs(outputs, MetaSpider(), response, 0) == [
+        {"url": test_response.url, "committee": "board", "page": 2}
+    ]
+
+
+def test_parses_in_process_pool():
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        outputs = pool.submit(
+            parse_in_worker, *worker_args(FortxFortWorthIsdSpider, test_response)
+        ).result()
+    items = _restore_outputs(outputs, FortxFortWorthIsdSpider(), test_response, 0)
+    assert [item["title"] for item in items] == [
+        "Special School Board Meeting",
+        "Regular School Board Meeting",
+    ]
+    assert (
+        items[0]["id"]
+        == "fortx_Fort_Worth_Isd/202410081730/x/special_school_board_meeting"
+    )
+
+
+def wait_for(dfd, timeout=60):
+    """Run calls passed to the reactor from other threads until a Deferred fires,
+    returning its result or Failure
+    """
+    results = []
+    dfd.addBoth(results.append)
+    deadline = time.monotonic() + timeout
+    while not results and time.monotonic() < deadline:
+        reactor.runUntilCurrent()
+        time.sleep(0.01)
+    return results[0]
+
+
+def offload_spider(spider_cls):
+    crawler = get_crawler(spider_cls, {"CITY_SCRAPERS_PARSE_WORKERS": 1})
+    return crawler._create_spider()
+
+
+def test_offload():
+    try:
+        spider = offload_spider(FortxFortWorthIsdSpider)
+        dfd = spider.parse(test_response)
+        assert isinstance(dfd, defer.Deferred)
+        items = wait_for(dfd)
+        assert [item["id"] for item in items] == [
+            item["id"] for item in FortxFortWorthIsdSpider().parse(test_response)
+        ]
+        assert spider.crawler.stats.get_value("offload/parsed") == 1
+
+        failing_spider = offload_spider(FailingSpider)
+        failure = wait_for(failing_spider.parse(test_response))
+        assert failure.check(ValueError)
+        assert failing_spider.crawler.stats.get_value("offload/parsed") is None
+    finally:
+        pool = offload._pool
+        offload.shutdown_pool()
+    assert offload._pool is None
+    with pytest.raises(RuntimeError):
+        pool.submit(print)
+
+
+def test_unchanged_not_offloaded(tmp_path, monkeypatch):
+    settings = {
+        "CITY_SCRAPERS_PARSE_WORKERS": 1,
+        "CITY_SCRAPERS_CONTENT_HASH": True,
+        "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+    }
+    request = Request(test_response.url, meta={"committee": "board"})
+    response = test_response.replace(request=request)
+    for run in range(2):
+        crawler = get_crawler(MetaSpider, settings)
+        spider = crawler._create_spider()
+        crawler.stats.open_spider(spider)
+        middleware = ContentHashMiddleware.from_crawler(crawler)
+        middleware.spider_opened(spider)
+        if run == 0:
+            # Store the output of a callback parsed inline
+            outputs = list(MetaSpider.parse.__wrapped__(spider, response))
+            list(middleware.process_spider_output(response, outputs, spider))
+            middleware.spider_closed(spider, "finished")
+
+    # The unchanged response isn't sent to a worker, and its stored output is
+    # replayed by the middleware
+    monkeypatch.setattr(offload, "_offload", None)
+    result = spider.parse(response)
+    assert result == []
+    assert list(middleware.process_spider_output(response, result, spider)) == outputs
+    assert crawler.stats.get_value("offload/skipped_unchanged", spider=spider) == 1
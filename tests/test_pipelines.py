@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+from city_scrapers_core.constants import BOARD, CANCELLED, TENTATIVE
+from city_scrapers_core.items import Meeting
+from freezegun import freeze_time
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.pipelines import LocalDiffPipeline
+
+
+def diff_pipeline(tmp_path, enabled=True):
+    crawler = get_crawler(
+        Spider,
+        {"CITY_SCRAPERS_STATE_DIR": str(tmp_path), "CITY_SCRAPERS_LOCAL_DIFF": enabled},
+    )
+    spider = crawler._create_spider("test")
+    crawler.stats.open_spider(spider)
+    pipeline = LocalDiffPipeline.from_crawler(crawler)
+    pipeline.open_spider(spider)
+    return pipeline, spider
+
+
+def meeting(meeting_id, day, title="Board Meeting"):
+    return Meeting(
+        id=meeting_id,
+        title=title,
+        classification=BOARD,
+        start=datetime(2023, 1, day, 18),
+        end=None,
+        status=TENTATIVE,
+        links=[],
+    )
+
+
+def process(pipeline, spider, items):
+    output = []
+    for item in items:
+        try:
+            output.append(pipeline.process_item(item, spider))
+        except DropItem:
+            pass
+    return output
+
+
+def test_disabled(tmp_path):
+    with pytest.raises(NotConfigured):
+        diff_pipeline(tmp_path, enabled=False)
+
+
+@freeze_time("2023-01-01")
+def test_outputs_changes(tmp_path):
+    pipeline, spider = diff_pipeline(tmp_path)
+    items = [meeting("a", 10), meeting("b", 11), meeting("a", 10)]
+    assert process(pipeline, spider, items) == items[:2]
+    pipeline.spider_closed(spider, "finished")
+
+    pipeline, spider = diff_pipeline(tmp_path)
+    items = [meeting("a", 10), meeting("b", 11, title="Special Meeting")]
+    assert process(pipeline, spider, items) == items[1:]
+    assert pipeline.stats.get_value("diff/unchanged", spider=spider) == 1
+    assert pipeline.stats.get_value("diff/changed", spider=spider) == 1
+    pipeline.spider_closed(spider, "finished")
+
+
+def test_cancels_missing_meetings(tmp_path):
+    with freeze_time("2023-01-01"):
+        pipeline, spider = diff_pipeline(tmp_path)
+        process(pipeline, spider, [meeting("a", 2), meeting("b", 10)])
+        pipeline.spider_closed(spider, "finished")
+
+    with freeze_time("2023-01-05"):
+        pipeline, spider = diff_pipeline(tmp_path)
+        missing = pipeline.missing_meetings()
+        assert len(missing) == 1
+        assert missing[0]["id"] == "b"
+        assert missing[0]["status"] == CANCELLED
+        assert missing[0]["start"] == datetime(2023, 1, 10, 18)
+        assert process(pipeline, spider, missing) == missing
+        pipeline.spider_closed(spider, "finished")
+
+        pipeline, spider = diff_pipeline(tmp_path)
+        assert pipeline.missing_meetings() == []
+        pipeline.spider_closed(spider, "finished")
+
+
+@freeze_time("2023-01-01")
+def test_unfinished_crawl_not_saved(tmp_path):
+    pipeline, spider = diff_pipeline(tmp_path)
+    process(pipeline, spider, [meeting("a", 10)])
+    pipeline.spider_closed(spider, "finished")
+
+    pipeline, spider = diff_pipeline(tmp_path)
+    items = [meeting("a", 10, title="Special Meeting"), meeting("b", 11)]
+    assert process(pipeline, spider, items) == items
+    pipeline.spider_closed(spider, "shutdown")
+
+    # Meetings from the crawl that didn't finish are output again
+    pipeline, spider = diff_pipeline(tmp_path)
+    assert process(pipeline, spider, items) == items
+    pipeline.spider_closed(spider, "finished")
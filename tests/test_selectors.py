@@ -0,0 +1,55 @@
+from scrapy import Spider
+from scrapy.http import HtmlResponse
+from scrapy.statscollectors import StatsCollector
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.extensions import SelectorStatsExtension
+from city_scrapers.selectors import SelectorRegistry
+
+BODY = b"""
+<html><body>
+<div class="day"><time class="start" datetime="2024-10-08T17:30:00">5:30</time>
+<a href="/agenda">Agenda</a></div>
+<div class="day"><a href="/minutes">Minutes</a></div>
+</body></html>
+"""
+
+
+def test_registry():
+    selectors = SelectorRegistry(
+        css={"days": ".day", "start": ".start::attr(datetime)", "title": "a::text"},
+        xpath={"href": "descendant::a/@href"},
+    )
+    response = HtmlResponse(url="https://www.fwisd.org", body=BODY, encoding="utf-8")
+    days = selectors.xpath("days", response)
+    assert len(days) == 2
+    assert selectors.get("start", days[0]) == "2024-10-08T17:30:00"
+    assert type(selectors.get("start", days[0])) is str
+    assert selectors.get("start", days[1]) is None
+    assert selectors.get("start", days[1], "") == ""
+    assert [selectors.get("title", day) for day in days] == ["Agenda", "Minutes"]
+    assert selectors.xpath("href", response.selector) == ["/agenda", "/minutes"]
+
+    stats = StatsCollector(get_crawler())
+    selectors.record_stats(stats)
+    assert stats.get_value("selectors/start/count") == 4
+    assert stats.get_value("selectors/title/count") == 2
+    assert stats.get_value("selectors/days/time_ms") >= 0
+
+
+class SelectorSpider(Spider):
+    name = "selectors"
+    selectors = SelectorRegistry(css={"days": ".day"})
+
+
+def test_stats_per_crawl():
+    response = HtmlResponse(url="https://www.fwisd.org", body=BODY, encoding="utf-8")
+    for _ in range(2):
+        crawler = get_crawler(SelectorSpider)
+        extension = SelectorStatsExtension.from_crawler(crawler)
+        spider = SelectorSpider()
+        extension.spider_opened(spider)
+        spider.selectors.xpath("days", response)
+        extension.spider_closed(spider)
+        # Counts from the previous crawl of the same spider class aren't included
+        assert crawler.stats.get_value("selectors/days/count") == 1
@@ -0,0 +1,26 @@
+from scrapy.http import HtmlResponse
+
+from city_scrapers.streaming import has_class, iter_html_elements
+
+BODY = b"""
+<html><body>
+<div class="day"><span class="title">First</span></div>
+<div class="other"><p>Skipped</p></div>
+<div class="day event"><span class="title">Second</span></div>
+</body></html>
+"""
+
+
+def test_iter_html_elements():
+    response = HtmlResponse(url="https://www.fwisd.org", body=BODY, encoding="utf-8")
+    titles = []
+    previous = None
+    for element in iter_html_elements(
+        response, lambda el: has_class(el, "day"), tags="div", chunk_size=16
+    ):
+        titles.append(element.css(".title::text").get())
+        if previous is not None:
+            # processed elements are cleared as the parser moves on
+            assert len(previous) == 0
+        previous = element.root
+    assert titles == ["First", "Second"]
@@ -0,0 +1,113 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from scrapy import Request
+from scrapy.http import HtmlResponse
+from scrapy.spiders import Spider
+from scrapy.utils.test import get_crawler
+
+from city_scrapers.middleware import CityScrapersWaybackMiddleware
+from city_scrapers.wayback import WaybackQueue
+
+
+class WaybackHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = self.path[len("/save/") :]
+        self.server.requests.append(url)
+        if "missing" in url:
+            status = 404
+        elif "retry" in url and self.server.requests.count(url) == 1:
+            status = 503
+        elif "down" in url:
+            status = 503
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def wayback_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), WaybackHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_port}/save/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_queue_retries_and_fails(wayback_server):
+    server, endpoint = wayback_server
+    sent = []
+    wayback_queue = WaybackQueue(
+        endpoint=endpoint,
+        workers=2,
+        max_retries=2,
+        backoff=0.01,
+        on_success=sent.append,
+    )
+    wayback_queue.start()
+    for url in ["https://a.pdf", "https://retry.pdf", "https://missing.pdf"]:
+        wayback_queue.put(url)
+    assert wayback_queue.close(timeout=5) == []
+    assert sorted(sent) == ["https://a.pdf", "https://retry.pdf"]
+    assert server.requests.count("https://retry.pdf") == 2
+    assert server.requests.count("https://missing.pdf") == 1
+    assert wayback_queue.counts == {"queued": 3, "sent": 2, "retried": 1, "failed": 1}
+    assert len(wayback_queue.latencies) == 2
+
+
+def test_queue_returns_unsent_urls(wayback_server):
+    _, endpoint = wayback_server
+    wayback_queue = WaybackQueue(endpoint=endpoint, workers=1, backoff=30)
+    wayback_queue.start()
+    wayback_queue.put("https://down.pdf")
+    wayback_queue.put("https://a.pdf")
+    assert sorted(wayback_queue.close(timeout=0.5)) == [
+        "https://a.pdf",
+        "https://down.pdf",
+    ]
+
+
+def queue_crawler(tmp_path, endpoint):
+    crawler = get_crawler(
+        Spider,
+        {
+            "CITY_SCRAPERS_STATE_DIR": str(tmp_path),
+            "CITY_SCRAPERS_WAYBACK_QUEUE": True,
+            "CITY_SCRAPERS_WAYBACK_ENDPOINT": endpoint,
+            "CITY_SCRAPERS_WAYBACK_BACKOFF": 30,
+        },
+    )
+    spider = crawler._create_spider("test")
+    crawler.spider = spider
+    crawler.stats.open_spider(spider)
+    middleware = CityScrapersWaybackMiddleware.from_crawler(crawler)
+    middleware.spider_opened(spider)
+    return middleware, spider
+
+
+def test_middleware_queues_and_spools(tmp_path, wayback_server):
+    server, endpoint = wayback_server
+    middleware, spider = queue_crawler(tmp_path, endpoint)
+    request = Request("https://www.fwisd.org/board")
+    response = HtmlResponse(url=request.url, request=request, body=b"")
+    item = {"documents": [{"url": "https://down.pdf"}]}
+    assert list(middleware.process_spider_output(response, [item], spider)) == [item]
+    middleware._queue_closed(middleware.queue.close(timeout=1), spider)
+
+    stats = middleware.stats
+    assert stats.get_value("wayback/queue/sent", spider=spider) == 1
+    assert stats.get_value("wayback/queue/spooled_out", spider=spider) == 1
+    assert list(middleware.archived) == ["https://www.fwisd.org/board"]
+
+    middleware, spider = queue_crawler(tmp_path, endpoint)
+    assert middleware.stats.get_value("wayback/queue/spooled_in", spider=spider) == 1
+    assert middleware.submitted == {"https://down.pdf"}
+    middleware.queue.close(timeout=0)